@@ -1,24 +1,55 @@
-from flask import Flask, request, jsonify, g
+from flask import Flask, request, jsonify, g, copy_current_request_context
+from flask.json.provider import JSONProvider
+from functools import wraps
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import os
-import uuid
+import orjson
 from datetime import datetime
+from urllib.parse import urlencode
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
 from auth_middleware import require_auth, add_auth_headers, is_public_route
-from logger import logger, log_request, log_response
+from logger import logger, log_request, log_response, new_request_id
 from rate_limiter import rate_limit, global_limiter, auth_limiter, order_creation_limiter
-from circuit_breaker import CircuitBreaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from response_cache import cached, invalidates, response_cache
+from metrics import start_request_timer, observe_request, observe_upstream, mount_metrics
+
+class ORJSONProvider(JSONProvider):
+    """JSON провайдер Flask на orjson: jsonify и request.json без stdlib json"""
+    
+    # datetime без tz считается UTC и пишется с Z
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Байты orjson отдаются как есть, без промежуточной str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=str, option=self.option),
+            mimetype='application/json'
+        )
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
+mount_metrics(app)
 
 @app.before_request
 def before_request():
     """Обработка запроса до маршрутизации"""
+    start_request_timer()
+    
     # Генерируем или получаем request_id
-    request_id = request.headers.get('X-Request-ID', str(uuid.uuid4()))
+    request_id = request.headers.get('X-Request-ID') or new_request_id()
     g.request_id = request_id
-    request.environ['HTTP_X_REQUEST_ID'] = request_id
     
     # Логируем запрос
     log_request()
@@ -26,21 +57,93 @@ def before_request():
 @app.after_request
 def after_request(response):
     """Обработка ответа"""
+    observe_request(response)
     return log_response(response)
 
 PORT = int(os.environ.get('PORT', 8000))
 USERS_SERVICE_URL = os.environ.get('USERS_SERVICE_URL', 'http://service_users:8001')
 ORDERS_SERVICE_URL = os.environ.get('ORDERS_SERVICE_URL', 'http://service_orders:8002')
 
-# Создаем улучшенные Circuit Breakers
-users_circuit = CircuitBreaker('users_service', timeout=3, error_threshold=0.5, reset_timeout=10)
-orders_circuit = CircuitBreaker('orders_service', timeout=3, error_threshold=0.5, reset_timeout=10)
+# URL сервисов собираются один раз при импорте, а не на каждый запрос
+USERS_URL = f'{USERS_SERVICE_URL}/v1/users'
+USERS_URL_PREFIX = USERS_URL + '/'
+USERS_REGISTER_URL = USERS_URL + '/register'
+USERS_LOGIN_URL = USERS_URL + '/login'
+USERS_PROFILE_URL = USERS_URL + '/profile'
+USERS_PASSWORD_URL = USERS_URL + '/profile/password'
+USERS_SEARCH_URL = USERS_URL + '/search'
+USERS_STATS_URL = USERS_URL + '/stats'
+ORDERS_URL = f'{ORDERS_SERVICE_URL}/v1/orders'
+ORDERS_URL_PREFIX = ORDERS_URL + '/'
+ORDERS_STATS_URL = ORDERS_URL + '/stats'
+ORDERS_MY_STATS_URL = ORDERS_URL + '/my-stats'
+ORDERS_STATUS_URL = f'{ORDERS_SERVICE_URL}/orders/status'
+ORDERS_HEALTH_URL = f'{ORDERS_SERVICE_URL}/orders/health'
 
-def call_users_service(url, method='GET', data=None):
+# Создаем улучшенные Circuit Breakers
+def invalidate_gateway_cache():
+    """/health и /metrics показывают состояние circuit breaker: кэш сбрасывается на переходах"""
+    response_cache.invalidate('gateway')
+
+users_circuit = CircuitBreaker('users_service', timeout=3, error_threshold=0.5, reset_timeout=10,
+                               on_state_change=invalidate_gateway_cache)
+orders_circuit = CircuitBreaker('orders_service', timeout=3, error_threshold=0.5, reset_timeout=10,
+                                on_state_change=invalidate_gateway_cache)
+
+def error_body(payload):
+    """Тело ответа об ошибке, сериализованное один раз при импорте"""
+    return orjson.dumps(payload)
+
+USERS_UNAVAILABLE_BODY = error_body({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}})
+ORDERS_UNAVAILABLE_BODY = error_body({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}})
+SERVICE_UNAVAILABLE_BODY = error_body({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Service temporarily unavailable'}})
+INTERNAL_ERROR_BODY = error_body({'error': 'Internal server error'})
+INVALID_JSON_BODY = error_body({'success': False, 'error': {'code': 'INVALID_JSON', 'message': 'Request body must be valid JSON'}})
+
+def error_response(body, status):
+    # Новый Response на каждый вызов: after_request и rate_limit дописывают в него заголовки
+    return app.response_class(body, status=status, mimetype='application/json')
+
+def create_upstream_session(pool_connections=32, pool_maxsize=128):
+    """Долгоживущая сессия с пулом keep-alive соединений к сервису"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept': 'application/json'})
+    return session
+
+# По одной сессии на каждый upstream, чтобы соединения переиспользовались между запросами
+users_session = create_upstream_session()
+orders_session = create_upstream_session()
+
+# Пул для параллельных запросов к нескольким сервисам в составных эндпоинтах
+fanout_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='fanout')
+
+# Параметры, которые пробрасываются в upstream для списков
+USERS_LIST_PARAMS = frozenset({'page', 'per_page', 'query', 'role', 'cursor'})
+USERS_SEARCH_PARAMS = frozenset({'q', 'page', 'per_page', 'cursor'})
+ORDERS_LIST_PARAMS = frozenset({
+    'page', 'per_page', 'userId', 'status', 'min_amount', 'max_amount', 'sort_by', 'sort_order', 'cursor', 'fields',
+    'exact_count'
+})
+
+def build_query_string(allowed):
+    """Query string для upstream из разрешенных непустых параметров запроса"""
+    params = [(key, value) for key, value in request.args.items(multi=True) if value and key in allowed]
+    return '?' + urlencode(params) if params else ''
+
+def upstream_response(body, status, content_type):
+    """Ответ сервиса отдается клиенту как есть, без разбора и повторной сериализации JSON"""
+    return app.response_class(body, status=status, content_type=content_type)
+
+def call_users_service(url, method='GET', data=None, headers=None):
     try:
-        headers = add_auth_headers()
+        if headers is None:
+            headers = add_auth_headers()
         logger.debug('Calling users service', url=url, method=method)
-        response = requests.request(method, url, json=data, headers=headers, timeout=3)
+        response = users_session.request(method, url, json=data, headers=headers, timeout=3)
+        observe_upstream('users', response)
         
         logger.info(
             'Users service response',
@@ -50,10 +153,9 @@ def call_users_service(url, method='GET', data=None):
             response_time=response.elapsed.total_seconds()
         )
         
-        if response.status_code == 404:
-            return response.json(), response.status_code
-        response.raise_for_status()
-        return response.json(), response.status_code
+        if response.status_code != 404:
+            response.raise_for_status()
+        return response.content, response.status_code, response.headers.get('Content-Type', 'application/json')
     except requests.exceptions.RequestException as e:
         logger.error(
             'Users service request failed',
@@ -66,11 +168,13 @@ def call_users_service(url, method='GET', data=None):
         logger.error('Unexpected error calling users service', exc_info=e)
         raise e
 
-def call_orders_service(url, method='GET', data=None):
+def call_orders_service(url, method='GET', data=None, headers=None):
     try:
-        headers = add_auth_headers()
+        if headers is None:
+            headers = add_auth_headers()
         logger.debug('Calling orders service', url=url, method=method)
-        response = requests.request(method, url, json=data, headers=headers, timeout=3)
+        response = orders_session.request(method, url, json=data, headers=headers, timeout=3)
+        observe_upstream('orders', response)
         
         logger.info(
             'Orders service response',
@@ -79,10 +183,9 @@ def call_orders_service(url, method='GET', data=None):
             status_code=response.status_code,
             response_time=response.elapsed.total_seconds()
         )
-        if response.status_code == 404:
-            return response.json(), response.status_code
-        response.raise_for_status()
-        return response.json(), response.status_code
+        if response.status_code != 404:
+            response.raise_for_status()
+        return response.content, response.status_code, response.headers.get('Content-Type', 'application/json')
     except requests.exceptions.RequestException as e:
         logger.error(
             'Orders service request failed',
@@ -95,260 +198,197 @@ def call_orders_service(url, method='GET', data=None):
         logger.error('Unexpected error calling orders service', exc_info=e)
         raise e
 
+# Ошибки, при которых сервис считается недоступным; остальные уходят в обработчик Flask
+UPSTREAM_ERRORS = (requests.exceptions.RequestException, CircuitOpenError)
+
+def upstream(circuit, service_call, error_body, error_status=503):
+    """
+    Декоратор эндпоинта-прокси
+
+    Обработчик возвращает аргументы запроса к сервису (url или кортеж
+    url, method, data), а вызов через circuit breaker и ответ об ошибке
+    выполняются здесь.
+
+    :param circuit: Circuit Breaker сервиса
+    :param service_call: Функция вызова сервиса
+    :param error_body: Тело ответа, если сервис недоступен
+    :param error_status: HTTP статус этого ответа
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            try:
+                call_args = f(*args, **kwargs)
+            except (BadRequest, UnsupportedMediaType) as e:
+                # request.json: тело не JSON или Content-Type не application/json (400/415)
+                return error_response(INVALID_JSON_BODY, e.code)
+            if isinstance(call_args, str):
+                call_args = (call_args,)
+            try:
+                return upstream_response(*circuit.call(service_call, *call_args))
+            except UPSTREAM_ERRORS as e:
+                logger.warning('Upstream call failed', endpoint=request.endpoint, service=circuit.service_name, error=str(e))
+                return error_response(error_body, error_status)
+
+        return wrapped
+
+    return decorator
+
 @app.route('/v1/users/register', methods=['POST'])
 @rate_limit(auth_limiter)
+@invalidates('users')
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def register():
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/register', 'POST', request.json)
-        return jsonify(result), status
-    except Exception as e:
-        logger.error('Register endpoint failed', exc_info=e)
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_REGISTER_URL, 'POST', request.json
 
 @app.route('/v1/users/login', methods=['POST'])
 @rate_limit(auth_limiter)
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def login():
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/login', 'POST', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_LOGIN_URL, 'POST', request.json
 
 @app.route('/v1/users/profile', methods=['GET'])
 @require_auth
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def get_profile():
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/profile')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_PROFILE_URL
 
 @app.route('/v1/users/profile', methods=['PUT'])
 @require_auth
+@invalidates('users')
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def update_profile():
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/profile', 'PUT', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_PROFILE_URL, 'PUT', request.json
 
 @app.route('/v1/users/<user_id>', methods=['GET'])
 @require_auth
+@cached('users', ttl=10)
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def get_user(user_id):
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/{user_id}')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_URL_PREFIX + user_id
 
 @app.route('/v1/users', methods=['GET'])
 @require_auth
+@cached('users', ttl=10)
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def get_users():
-    try:
-        query_string = ''
-        if request.args:
-            params = []
-            if request.args.get('page'):
-                params.append(f"page={request.args.get('page')}")
-            if request.args.get('per_page'):
-                params.append(f"per_page={request.args.get('per_page')}")
-            if request.args.get('query'):
-                params.append(f"query={request.args.get('query')}")
-            if request.args.get('role'):
-                params.append(f"role={request.args.get('role')}")
-            if params:
-                query_string = '?' + '&'.join(params)
-        
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users{query_string}')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_URL + build_query_string(USERS_LIST_PARAMS)
 
 @app.route('/v1/users/<user_id>', methods=['DELETE'])
 @require_auth
+@invalidates('users')
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def delete_user(user_id):
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/{user_id}', 'DELETE')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_URL_PREFIX + user_id, 'DELETE'
 
 @app.route('/v1/users/<user_id>', methods=['PUT'])
 @require_auth
+@invalidates('users')
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def update_user(user_id):
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/{user_id}', 'PUT', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_URL_PREFIX + user_id, 'PUT', request.json
 
 @app.route('/v1/users/profile/password', methods=['PUT'])
 @require_auth
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def change_password():
     """Изменение пароля"""
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/profile/password', 'PUT', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_PASSWORD_URL, 'PUT', request.json
 
 @app.route('/v1/users/<user_id>/roles', methods=['PUT'])
 @require_auth
+@invalidates('users')
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def update_user_roles(user_id):
     """Обновление ролей"""
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/{user_id}/roles', 'PUT', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_URL_PREFIX + user_id + '/roles', 'PUT', request.json
 
 @app.route('/v1/users/search', methods=['GET'])
 @require_auth
+@cached('users', ttl=10)
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def search_users():
     """Поиск пользователей"""
-    try:
-        query_string = ''
-        if request.args:
-            params = []
-            if request.args.get('q'):
-                params.append(f"q={request.args.get('q')}")
-            if request.args.get('page'):
-                params.append(f"page={request.args.get('page')}")
-            if request.args.get('per_page'):
-                params.append(f"per_page={request.args.get('per_page')}")
-            if params:
-                query_string = '?' + '&'.join(params)
-        
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/search{query_string}')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_SEARCH_URL + build_query_string(USERS_SEARCH_PARAMS)
 
 @app.route('/v1/users/stats', methods=['GET'])
 @require_auth
+@cached('users', ttl=30)
+@upstream(users_circuit, call_users_service, USERS_UNAVAILABLE_BODY)
 def get_user_stats():
     """Статистика пользователей"""
-    try:
-        result, status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/stats')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Users service temporarily unavailable'}}), 503
+    return USERS_STATS_URL
 
 @app.route('/v1/orders/<order_id>', methods=['GET'])
 @require_auth
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def get_order(order_id):
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders/{order_id}')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_URL_PREFIX + order_id
 
 @app.route('/v1/orders', methods=['POST'])
 @require_auth
 @rate_limit(order_creation_limiter)
+@invalidates('orders')
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def create_order():
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders', 'POST', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_URL, 'POST', request.json
 
 @app.route('/v1/orders', methods=['GET'])
 @require_auth
+@cached('orders', ttl=5)
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def get_orders():
-    try:
-        query_string = ''
-        if request.args:
-            params = []
-            if request.args.get('page'):
-                params.append(f"page={request.args.get('page')}")
-            if request.args.get('per_page'):
-                params.append(f"per_page={request.args.get('per_page')}")
-            if request.args.get('userId'):
-                params.append(f"userId={request.args.get('userId')}")
-            if request.args.get('status'):
-                params.append(f"status={request.args.get('status')}")
-            if request.args.get('min_amount'):
-                params.append(f"min_amount={request.args.get('min_amount')}")
-            if request.args.get('max_amount'):
-                params.append(f"max_amount={request.args.get('max_amount')}")
-            if request.args.get('sort_by'):
-                params.append(f"sort_by={request.args.get('sort_by')}")
-            if request.args.get('sort_order'):
-                params.append(f"sort_order={request.args.get('sort_order')}")
-            if params:
-                query_string = '?' + '&'.join(params)
-        
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders{query_string}')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_URL + build_query_string(ORDERS_LIST_PARAMS)
 
 @app.route('/v1/orders/<order_id>', methods=['DELETE'])
 @require_auth
+@invalidates('orders')
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def delete_order(order_id):
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders/{order_id}', 'DELETE')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_URL_PREFIX + order_id, 'DELETE'
 
 @app.route('/v1/orders/<order_id>', methods=['PUT'])
 @require_auth
+@invalidates('orders')
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def update_order(order_id):
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders/{order_id}', 'PUT', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_URL_PREFIX + order_id, 'PUT', request.json
 
 @app.route('/v1/orders/<order_id>/status', methods=['PUT'])
 @require_auth
+@invalidates('orders')
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def update_order_status(order_id):
     """Обновление только статуса заказа"""
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders/{order_id}/status', 'PUT', request.json)
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_URL_PREFIX + order_id + '/status', 'PUT', request.json
 
 @app.route('/v1/orders/stats', methods=['GET'])
 @require_auth
+@cached('orders', ttl=10)
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def get_order_stats():
     """Статистика заказов (admin)"""
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders/stats')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_STATS_URL
 
 @app.route('/v1/orders/my-stats', methods=['GET'])
 @require_auth
+@upstream(orders_circuit, call_orders_service, ORDERS_UNAVAILABLE_BODY)
 def get_my_order_stats():
     """Статистика своих заказов"""
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders/my-stats')
-        return jsonify(result), status
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Orders service temporarily unavailable'}}), 503
+    return ORDERS_MY_STATS_URL
 
 @app.route('/orders/status', methods=['GET'])
+@upstream(orders_circuit, call_orders_service, INTERNAL_ERROR_BODY, 500)
 def orders_status():
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/orders/status')
-        return jsonify(result), status
-    except:
-        return jsonify({'error': 'Internal server error'}), 500
+    return ORDERS_STATUS_URL
 
 @app.route('/orders/health', methods=['GET'])
+@upstream(orders_circuit, call_orders_service, INTERNAL_ERROR_BODY, 500)
 def orders_health():
-    try:
-        result, status = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/orders/health')
-        return jsonify(result), status
-    except:
-        return jsonify({'error': 'Internal server error'}), 500
+    return ORDERS_HEALTH_URL
 
 @app.route('/health', methods=['GET'])
+@cached('gateway', ttl=2)
 def gateway_health():
     """Проверка здоровья API Gateway"""
     health_status = {
@@ -364,6 +404,7 @@ def gateway_health():
 
 @app.route('/metrics', methods=['GET'])
 @require_auth
+@cached('gateway', ttl=2)
 def get_metrics():
     """Получение метрик системы (требует аутентификации)"""
     metrics = {
@@ -382,40 +423,36 @@ def get_metrics():
 @require_auth
 def get_user_details(user_id):
     try:
-        user_result, user_status = users_circuit.call(call_users_service, f'{USERS_SERVICE_URL}/v1/users/{user_id}')
+        # Запросы независимы, поэтому выполняем их параллельно. Заголовки
+        # собираются здесь: в потоке пула g другой и request_id в нем нет
+        user_future = fanout_executor.submit(
+            copy_current_request_context(users_circuit.call),
+            call_users_service, USERS_URL_PREFIX + user_id, 'GET', None, add_auth_headers()
+        )
+        orders_future = fanout_executor.submit(
+            copy_current_request_context(orders_circuit.call),
+            call_orders_service, ORDERS_URL + '?' + urlencode({'userId': user_id}), 'GET', None, add_auth_headers()
+        )
+        
+        user_body, user_status, user_content_type = user_future.result()
         if user_status == 404:
-            return jsonify(user_result), user_status
+            # Заказы не нужны: отменяем запрос, если он еще не начался
+            orders_future.cancel()
+            return upstream_response(user_body, user_status, user_content_type)
         
-        orders_result, _ = orders_circuit.call(call_orders_service, f'{ORDERS_SERVICE_URL}/v1/orders?userId={user_id}')
+        orders_body, _, _ = orders_future.result()
         
+        # Единственный эндпоинт, которому нужно содержимое ответов: собираем их в один
+        user_result = orjson.loads(user_body)
+        orders_result = orjson.loads(orders_body)
         user_data = user_result.get('data', user_result) if isinstance(user_result, dict) else user_result
         orders_data = orders_result.get('data', []) if isinstance(orders_result, dict) else orders_result
         
         return jsonify({'success': True, 'data': {'user': user_data, 'orders': orders_data}}), 200
-    except:
-        return jsonify({'success': False, 'error': {'code': 'SERVICE_UNAVAILABLE', 'message': 'Service temporarily unavailable'}}), 503
-
-@app.route('/health', methods=['GET'])
-def health():
-    return jsonify({
-        'status': 'API Gateway is running',
-        'circuits': {
-            'users': {
-                'status': users_circuit.state,
-                'stats': {
-                    'failures': users_circuit.failure_count,
-                    'successes': users_circuit.success_count
-                }
-            },
-            'orders': {
-                'status': orders_circuit.state,
-                'stats': {
-                    'failures': orders_circuit.failure_count,
-                    'successes': orders_circuit.success_count
-                }
-            }
-        }
-    }), 200
+    except UPSTREAM_ERRORS + (ValueError,) as e:
+        # ValueError (orjson.JSONDecodeError): сервис вернул не JSON
+        logger.warning('User details fan-out failed', user_id=user_id, error=str(e))
+        return error_response(SERVICE_UNAVAILABLE_BODY, 503)
 
 @app.route('/status', methods=['GET'])
 def status():
@@ -1,7 +1,12 @@
 """Middleware для проверки JWT токенов в API Gateway"""
 import os
+import re
+import time
+import hashlib
+import threading
 import jwt
-from flask import request, jsonify
+from cachetools import TTLCache
+from flask import request, jsonify, g
 from functools import wraps
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
@@ -14,24 +19,41 @@ PUBLIC_ROUTES = [
     '/status'
 ]
 
+# Точные совпадения проверяются по множеству, вложенные пути - одним регулярным выражением
+_PUBLIC_EXACT = frozenset(PUBLIC_ROUTES)
+_PUBLIC_PREFIX_RE = re.compile(
+    r'^(?:' + '|'.join(re.escape(route) for route in PUBLIC_ROUTES) + r')(?:/|$)'
+)
+
+# Кэш проверенных токенов: повторные запросы с тем же токеном не проверяют подпись заново
+_token_cache = TTLCache(maxsize=10000, ttl=60)
+_token_cache_lock = threading.Lock()
+
 
 def decode_token(token: str) -> dict:
     """Декодирование JWT токена"""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload.get('exp', 0) > time.time():
+        return payload
+    
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         raise Exception('Token expired')
     except jwt.InvalidTokenError:
         raise Exception('Invalid token')
+    
+    # Невалидные токены не кэшируются; запись живет не дольше 60 секунд и до exp
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
 
 
 def is_public_route(path: str) -> bool:
     """Проверка, является ли маршрут публичным"""
-    for public_route in PUBLIC_ROUTES:
-        if path.startswith(public_route):
-            return True
-    return False
+    return path in _PUBLIC_EXACT or _PUBLIC_PREFIX_RE.match(path) is not None
 
 
 def get_token_from_header() -> str:
@@ -40,7 +62,9 @@ def get_token_from_header() -> str:
     if not auth_header:
         raise Exception('Authorization header missing')
     
-    parts = auth_header.split()
+    # Разделители те же, что у split() (пробелы, табуляции, их повторы),
+    # но строка режется не больше двух раз: длинный хвост не дробится
+    parts = auth_header.split(None, 2)
     if len(parts) != 2 or parts[0].lower() != 'bearer':
         raise Exception('Invalid authorization header format')
     
@@ -79,7 +103,7 @@ def add_auth_headers(headers=None):
     if hasattr(request, 'internal_token') and request.internal_token:
         headers['Authorization'] = f'Bearer {request.internal_token}'
     
-    request_id = request.headers.get('X-Request-ID')
+    request_id = g.get('request_id')
     if request_id:
         headers['X-Request-ID'] = request_id
     
@@ -1,22 +1,95 @@
 """
 Улучшенный Circuit Breaker для API Gateway
 """
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+import itertools
 import threading
+import time
 from logger import logger
+from metrics import record_circuit_event
+
+# Состояния хранятся как int: сравнение на быстром пути дешевле строкового
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+STATE_NAMES = ('closed', 'half_open', 'open')
+
+
+def monotonic_to_iso(timestamp):
+    """Перевод time.monotonic() в ISO строку (только для статистики)"""
+    return datetime.fromtimestamp(time.time() - (time.monotonic() - timestamp)).isoformat()
+
+
+class CircuitOpenError(Exception):
+    """Запрос заблокирован открытым Circuit Breaker"""
+
+
+class AtomicCounter:
+    """
+    Счетчик на основе itertools.count: инкремент без блокировки
+
+    next() у itertools.count выполняется в C одной операцией под GIL,
+    поэтому инкременты из разных потоков не теряются. Общий array('q')
+    для всех счетчиков был бы компактнее, но += над его элементом - это
+    чтение и запись отдельными шагами, и без lock инкременты теряются.
+
+    Чтение тоже сдвигает счетчик, поэтому чтения считаются отдельно:
+    value = next(count) - next(reads). Два next() не атомарны вместе,
+    и одновременные чтения перепутали бы номера, поэтому value берет lock;
+    он нужен только статистике и проверке порога, инкременты его не ждут.
+    """
+    __slots__ = ('_count', '_reads', '_lock')
+
+    def __init__(self):
+        self._count = itertools.count()
+        self._reads = itertools.count()
+        self._lock = threading.Lock()
+
+    def increment(self):
+        next(self._count)
+
+    @property
+    def value(self):
+        # Инкремент между двумя next() уже засчитан или еще нет - оба
+        # значения верны; читатели под lock не расходуют чужие номера
+        with self._lock:
+            return next(self._count) - next(self._reads)
+
+
+@dataclass(slots=True, frozen=True)
+class _State:
+    """
+    Снимок состояния Circuit Breaker
+
+    Переход заменяет снимок целиком одной записью ссылки, поэтому
+    читатель без lock не увидит новое состояние со старыми счетчиками.
+    Ошибки - обычное число: каждая ошибка под lock заменяет снимок, и
+    решение о переходе принимается по согласованному значению. Успехи
+    считаются без lock в общем для снимков одного окна AtomicCounter.
+    """
+    state: int
+    since: float
+    failures: int = 0
+    successes: AtomicCounter = field(default_factory=AtomicCounter)
+    half_open_success: int = 0
+
 
 class CircuitBreaker:
     """
     Улучшенный Circuit Breaker с метриками и статусом
-    
+
     Состояния:
     - closed: Нормальная работа, запросы проходят
     - open: Сервис недоступен, запросы блокируются
     - half_open: Тестовый режим после таймаута
+
+    Успешный запрос в closed не берет блокировку: счетчики успехов
+    атомарные. Lock берется на переходах и на каждой ошибке: ошибки
+    считаются под ним, и порог проверяется по тем же значениям.
     """
-    
-    def __init__(self, service_name, timeout=3, error_threshold=0.5, 
-                 reset_timeout=10, min_requests=5, success_threshold=2):
+
+    def __init__(self, service_name, timeout=3, error_threshold=0.5,
+                 reset_timeout=10, min_requests=5, success_threshold=2,
+                 on_state_change=None):
         """
         :param service_name: Имя сервиса для логирования
         :param timeout: Таймаут запроса в секундах
@@ -24,6 +97,8 @@ class CircuitBreaker:
         :param reset_timeout: Время до попытки восстановления (секунды)
         :param min_requests: Минимум запросов для открытия
         :param success_threshold: Успешных запросов для закрытия в half-open
+        :param on_state_change: Вызывается без аргументов после смены состояния
+            (вне lock, например для сброса кэша статуса)
         """
         self.service_name = service_name
         self.timeout = timeout
@@ -31,152 +106,228 @@ class CircuitBreaker:
         self.reset_timeout = reset_timeout
         self.min_requests = min_requests
         self.success_threshold = success_threshold
-        
-        self.failure_count = 0
-        self.success_count = 0
-        self.half_open_success = 0  # Счетчик успехов в half-open
+        self.on_state_change = on_state_change
+
+        self._s = _State(CLOSED, time.monotonic())
         self.last_failure_time = None
-        self.state = 'closed'
         self.lock = threading.Lock()
-        
+
         # Метрики
-        self.total_requests = 0
-        self.total_failures = 0
-        self.last_state_change = datetime.now()
-    
+        self._total_requests = AtomicCounter()
+        self._total_failures = AtomicCounter()
+
+    @property
+    def state(self):
+        return STATE_NAMES[self._s.state]
+
+    @property
+    def failure_count(self):
+        return self._s.failures
+
+    @property
+    def success_count(self):
+        return self._s.successes.value
+
+    @property
+    def half_open_success(self):
+        return self._s.half_open_success
+
+    @property
+    def last_state_change(self):
+        return self._s.since
+
+    @property
+    def total_requests(self):
+        return self._total_requests.value
+
+    @property
+    def total_failures(self):
+        return self._total_failures.value
+
     def call(self, func, *args, **kwargs):
         """
         Выполняет функцию через Circuit Breaker
-        
+
         :param func: Функция для вызова
         :return: Результат функции
-        :raises: Exception если circuit открыт или функция вызвала ошибку
+        :raises: CircuitOpenError если circuit открыт, либо ошибку функции
         """
+        self._total_requests.increment()
+
+        # Быстрый путь: снимок читается один раз без блокировки. Успех
+        # засчитывается в счетчики этого снимка; если за время запроса
+        # circuit перешел в другое состояние, старые счетчики уже не нужны,
+        # а пробным запросом half_open он не считается
+        s = self._s
+        if s.state == CLOSED:
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._on_failure(e)
+                raise
+            s.successes.increment()
+            return result
+
+        self._before_call()
+
+        # Выполняем запрос
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(e)
+            raise
+
+        self._on_success()
+        return result
+
+    def _state_changed(self):
+        if self.on_state_change is not None:
+            self.on_state_change()
+
+    def _before_call(self):
+        """Проверка open/half_open состояния перед запросом"""
+        changed = False
         with self.lock:
-            self.total_requests += 1
-            
-            if self.state == 'open':
+            s = self._s
+            if s.state == OPEN:
                 # Проверяем, не пора ли попробовать снова
-                if datetime.now() - self.last_failure_time > timedelta(seconds=self.reset_timeout):
-                    self.state = 'half_open'
-                    self.half_open_success = 0
-                    self.last_state_change = datetime.now()
+                now = time.monotonic()
+                if now - self.last_failure_time > self.reset_timeout:
+                    self._s = _State(HALF_OPEN, now, s.failures, s.successes)
+                    changed = True
+                    record_circuit_event(self.service_name, 'half_open', 'half_open')
                     logger.info(
                         f'{self.service_name} circuit breaker: half-open',
                         service=self.service_name,
-                        state_duration=(datetime.now() - self.last_state_change).total_seconds()
+                        state_duration=now - s.since
                     )
                 else:
+                    record_circuit_event(self.service_name, 'rejected', 'open')
                     logger.warning(
                         f'{self.service_name} circuit breaker: open (blocking request)',
                         service=self.service_name,
-                        remaining_time=(self.reset_timeout - (datetime.now() - self.last_failure_time).total_seconds())
+                        remaining_time=self.reset_timeout - (now - self.last_failure_time)
                     )
-                    raise Exception(f'Circuit breaker is open for {self.service_name}')
-        
-        # Выполняем запрос
-        try:
-            result = func(*args, **kwargs)
-            
-            # Успешный запрос
-            with self.lock:
-                self.success_count += 1
-                
-                if self.state == 'half_open':
-                    self.half_open_success += 1
-                    
-                    # Если достаточно успешных запросов, закрываем circuit
-                    if self.half_open_success >= self.success_threshold:
-                        old_state = self.state
-                        self.state = 'closed'
-                        self.failure_count = 0
-                        self.success_count = 0
-                        self.last_state_change = datetime.now()
-                        
-                        logger.info(
-                            f'{self.service_name} circuit breaker: closed',
-                            service=self.service_name,
-                            previous_state=old_state,
-                            recovery_successes=self.half_open_success
-                        )
-            
-            return result
-            
-        except Exception as e:
-            # Запрос провалился
-            with self.lock:
-                self.failure_count += 1
-                self.total_failures += 1
-                self.last_failure_time = datetime.now()
-                
-                if self.state == 'half_open':
-                    # В half-open режиме любая ошибка снова открывает circuit
-                    self.state = 'open'
-                    self.last_state_change = datetime.now()
-                    
-                    logger.error(
-                        f'{self.service_name} circuit breaker: reopened',
+                    raise CircuitOpenError(f'Circuit breaker is open for {self.service_name}')
+        if changed:
+            self._state_changed()
+
+    def _on_success(self):
+        """Учет успешного запроса вне closed состояния"""
+        changed = False
+        with self.lock:
+            s = self._s
+            s.successes.increment()
+
+            if s.state == HALF_OPEN:
+                half_open_success = s.half_open_success + 1
+
+                # Если достаточно успешных запросов, закрываем circuit
+                if half_open_success >= self.success_threshold:
+                    self._s = _State(CLOSED, time.monotonic())
+                    changed = True
+
+                    record_circuit_event(self.service_name, 'closed', 'closed')
+                    logger.info(
+                        f'{self.service_name} circuit breaker: closed',
                         service=self.service_name,
-                        exc_info=e
+                        previous_state=STATE_NAMES[s.state],
+                        recovery_successes=half_open_success
                     )
-                    
-                elif self.state == 'closed':
-                    # Проверяем, нужно ли открыть circuit
-                    total = self.failure_count + self.success_count
-                    
-                    if total >= self.min_requests:
-                        error_rate = self.failure_count / total
-                        
-                        if error_rate >= self.error_threshold:
-                            self.state = 'open'
-                            self.last_state_change = datetime.now()
-                            
-                            logger.error(
-                                f'{self.service_name} circuit breaker: opened',
-                                service=self.service_name,
-                                total_requests=total,
-                                failure_count=self.failure_count,
-                                error_rate=error_rate,
-                                threshold=self.error_threshold
-                            )
-            
-            raise e
-    
+                else:
+                    self._s = _State(HALF_OPEN, s.since, s.failures, s.successes, half_open_success)
+        if changed:
+            self._state_changed()
+
+    def _on_failure(self, e):
+        """Учет ошибки и открытие circuit при превышении порога"""
+        now = time.monotonic()
+        self._total_failures.increment()
+
+        if self._record_failure(e, now):
+            self._state_changed()
+
+    def _record_failure(self, e, now):
+        """Ошибка под lock; True, если circuit сменил состояние"""
+        with self.lock:
+            self.last_failure_time = now
+            s = self._s
+            failure_count = s.failures + 1
+
+            if s.state == HALF_OPEN:
+                # В half-open режиме любая ошибка снова открывает circuit
+                self._s = _State(OPEN, now, failure_count, s.successes)
+
+                record_circuit_event(self.service_name, 'reopened', 'open')
+                logger.error(
+                    f'{self.service_name} circuit breaker: reopened',
+                    service=self.service_name,
+                    exc_info=e
+                )
+                return True
+
+            if s.state == CLOSED:
+                # Проверяем, нужно ли открыть circuit
+                total = failure_count + s.successes.value
+
+                if total >= self.min_requests:
+                    error_rate = failure_count / total
+
+                    if error_rate >= self.error_threshold:
+                        self._s = _State(OPEN, now, failure_count, s.successes)
+
+                        record_circuit_event(self.service_name, 'opened', 'open')
+                        logger.error(
+                            f'{self.service_name} circuit breaker: opened',
+                            service=self.service_name,
+                            total_requests=total,
+                            failure_count=failure_count,
+                            error_rate=error_rate,
+                            threshold=self.error_threshold
+                        )
+                        return True
+
+            # Перехода нет: тот же снимок с новым числом ошибок
+            self._s = replace(s, failures=failure_count)
+            return False
+
     def get_stats(self):
         """
         Возвращает статистику Circuit Breaker
         """
-        with self.lock:
-            total = self.failure_count + self.success_count
-            error_rate = (self.failure_count / total) if total > 0 else 0
-            
-            return {
-                'service': self.service_name,
-                'state': self.state,
-                'total_requests': self.total_requests,
-                'total_failures': self.total_failures,
-                'window_requests': total,
-                'window_failures': self.failure_count,
-                'window_successes': self.success_count,
-                'error_rate': error_rate,
-                'last_failure_time': self.last_failure_time.isoformat() if self.last_failure_time else None,
-                'last_state_change': self.last_state_change.isoformat()
-            }
-    
+        # Один снимок: состояние и счетчики окна всегда согласованы, lock не нужен
+        s = self._s
+        failure_count = s.failures
+        success_count = s.successes.value
+        total = failure_count + success_count
+        error_rate = (failure_count / total) if total > 0 else 0
+        last_failure_time = self.last_failure_time
+
+        return {
+            'service': self.service_name,
+            'state': STATE_NAMES[s.state],
+            'total_requests': self.total_requests,
+            'total_failures': self.total_failures,
+            'window_requests': total,
+            'window_failures': failure_count,
+            'window_successes': success_count,
+            'error_rate': error_rate,
+            'last_failure_time': monotonic_to_iso(last_failure_time) if last_failure_time is not None else None,
+            'last_state_change': monotonic_to_iso(s.since)
+        }
+
     def reset(self):
         """
         Принудительный сброс Circuit Breaker (для админа)
         """
         with self.lock:
             old_state = self.state
-            self.state = 'closed'
-            self.failure_count = 0
-            self.success_count = 0
-            self.half_open_success = 0
-            self.last_state_change = datetime.now()
-            
+            self._s = _State(CLOSED, time.monotonic())
+
+            record_circuit_event(self.service_name, 'reset', 'closed')
             logger.info(
                 f'{self.service_name} circuit breaker: manually reset',
                 service=self.service_name,
                 previous_state=old_state
             )
+        self._state_changed()
@@ -0,0 +1,17 @@
+"""Конфигурация gunicorn для API Gateway"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+# Gateway только проксирует запросы: gevent мультиплексирует тысячи
+# ожидающих upstream-вызовов в одном процессе вместо потока на запрос
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GATEWAY_WORKER_CONNECTIONS', 1000))
+
+# Rate limiter и circuit breaker хранят состояние в памяти процесса,
+# поэтому по умолчанию запускается один воркер
+workers = int(os.environ.get('GATEWAY_WORKERS', 1))
+
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
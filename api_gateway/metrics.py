@@ -0,0 +1,116 @@
+"""
+Модуль Prometheus метрик для API Gateway
+"""
+import hmac
+import os
+import time
+import orjson
+from flask import request, g
+from prometheus_client import Counter, Gauge, Histogram, make_wsgi_app
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+# Статический токен Prometheus: без него /metrics-prom не подключается
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+METRICS_UNAUTHORIZED_BODY = orjson.dumps({
+    'success': False,
+    'error': {
+        'code': 'UNAUTHORIZED',
+        'message': 'Invalid metrics token'
+    }
+})
+
+# Числовое значение состояния для gauge
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+REQUEST_LATENCY = Histogram(
+    'gateway_request_seconds',
+    'Время обработки запроса в API Gateway',
+    ['endpoint', 'method', 'status']
+)
+
+UPSTREAM_LATENCY = Histogram(
+    'gateway_upstream_seconds',
+    'Время ответа сервиса',
+    ['service', 'status']
+)
+
+CIRCUIT_EVENTS = Counter(
+    'gateway_circuit_events',
+    'События Circuit Breaker (opened, half_open, closed, reopened, rejected, reset)',
+    ['service', 'event']
+)
+
+CIRCUIT_STATE = Gauge(
+    'gateway_circuit_state',
+    'Текущее состояние Circuit Breaker (0 closed, 1 half_open, 2 open)',
+    ['service']
+)
+
+
+def start_request_timer():
+    """Запоминает время начала запроса (вызывается в before_request)"""
+    g.request_started = time.perf_counter()
+
+
+def observe_request(response):
+    """Записывает время обработки запроса (вызывается в after_request)"""
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        REQUEST_LATENCY.labels(
+            request.endpoint or 'unknown',
+            request.method,
+            response.status_code
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def observe_upstream(service, response):
+    """Записывает время ответа сервиса"""
+    UPSTREAM_LATENCY.labels(service, response.status_code).observe(response.elapsed.total_seconds())
+
+
+def record_circuit_event(service, event, state):
+    """Учет перехода или блокировки в Circuit Breaker"""
+    CIRCUIT_EVENTS.labels(service, event).inc()
+    CIRCUIT_STATE.labels(service).set(CIRCUIT_STATES[state])
+
+
+def require_metrics_token(wsgi_app, token):
+    """
+    WSGI обертка: пропускает только запросы с "Authorization: Bearer <token>"
+
+    Эндпоинт подключен в обход Flask, поэтому require_auth здесь не работает,
+    а JWT пользователя для scrape неудобен: он истекает.
+    """
+    expected = f'Bearer {token}'.encode()
+
+    def app(environ, start_response):
+        provided = environ.get('HTTP_AUTHORIZATION', '').strip().encode()
+        if hmac.compare_digest(provided, expected):
+            return wsgi_app(environ, start_response)
+        start_response('401 UNAUTHORIZED', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(METRICS_UNAUTHORIZED_BODY))),
+            ('WWW-Authenticate', 'Bearer'),
+        ])
+        return [METRICS_UNAUTHORIZED_BODY]
+
+    return app
+
+
+def mount_metrics(app, path='/metrics-prom', token=METRICS_TOKEN):
+    """
+    Подключает эндпоинт Prometheus в обход Flask
+
+    Эндпоинт закрыт токеном METRICS_TOKEN; без токена не подключается,
+    чтобы метрики не оказались публичными. При нескольких воркерах
+    gunicorn нужен multiprocess режим prometheus_client
+    (PROMETHEUS_MULTIPROC_DIR), иначе каждый воркер отдает только свои
+    значения.
+    """
+    if not token:
+        return
+    app.wsgi_app = DispatcherMiddleware(
+        app.wsgi_app, {path: require_metrics_token(make_wsgi_app(), token)}
+    )
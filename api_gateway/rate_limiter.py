@@ -2,57 +2,113 @@
 Модуль для Rate Limiting в API Gateway
 """
 from datetime import datetime, timedelta
-from collections import defaultdict
+import math
 import threading
+import time
 from functools import wraps
-from flask import request, jsonify
+from flask import request, current_app
 from logger import logger
 
+# Число шардов (степень двойки, чтобы номер шарда брался маской)
+SHARD_COUNT = 32
+
+# Максимум идентификаторов в памяти одного limiter'а (на все шарды)
+MAX_IDENTIFIERS = 100_000
+
+# Тело ответа 429 собрано заранее: меняется только retry_after
+_RATE_LIMIT_JSON_PREFIX = (
+    b'{"success":false,"error":{"code":"RATE_LIMIT_EXCEEDED",'
+    b'"message":"Too many requests. Please try again later.","retry_after":'
+)
+_RATE_LIMIT_JSON_SUFFIX = b'}}'
+
 class RateLimiter:
     """
     Rate Limiter для ограничения количества запросов
-    Использует алгоритм Sliding Window
+    Использует алгоритм Sliding Window Counter
+
+    Вместо timestamp'а на каждый запрос хранится пара счетчиков: за
+    предыдущее и текущее окно. Число запросов за скользящее окно
+    оценивается как prev * (1 - elapsed / window) + curr.
+
+    Идентификаторы распределены по шардам по хэшу, у каждого шарда свой
+    lock, поэтому запросы разных клиентов не ждут друг друга. Записи
+    неактивных клиентов удаляет фоновый поток, а не обработка запросов.
+
+    Размер шарда ограничен: при переполнении вытесняется клиент, дольше
+    всех не начинавший новое окно (порядок ключей dict), так что поток
+    запросов с разных IP не раздувает память между очистками.
     """
     
-    def __init__(self, max_requests=100, window_seconds=60):
+    def __init__(self, max_requests=100, window_seconds=60, max_identifiers=MAX_IDENTIFIERS):
         """
         :param max_requests: Максимум запросов в окне
         :param window_seconds: Размер окна в секундах
+        :param max_identifiers: Максимум хранимых идентификаторов
         """
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests = defaultdict(list)  # IP -> список timestamp'ов
-        self.lock = threading.Lock()
+        self.shard_capacity = max(1, max_identifiers // SHARD_COUNT)
+        # Шард: (IP -> [prev_count, curr_count, номер окна], lock)
+        self.shards = [({}, threading.Lock()) for _ in range(SHARD_COUNT)]
+        
+        self._stop_cleanup = threading.Event()
+        self._cleanup_thread = threading.Thread(
+            target=self._cleanup_loop,
+            name=f'rate-limiter-cleanup-{max_requests}-{window_seconds}',
+            daemon=True
+        )
+        self._cleanup_thread.start()
+    
+    def _shard(self, identifier):
+        return self.shards[hash(identifier) & (SHARD_COUNT - 1)]
     
     def is_allowed(self, identifier):
         """
         Проверяет, разрешен ли запрос для данного идентификатора
         
         :param identifier: Идентификатор (IP адрес, user_id и т.д.)
-        :return: (allowed: bool, remaining: int, reset_time: datetime)
+        :return: (allowed: bool, remaining: int, reset_time: float по time.monotonic())
         """
-        with self.lock:
-            now = datetime.now()
-            window_start = now - timedelta(seconds=self.window_seconds)
+        window = self.window_seconds
+        requests, lock = self._shard(identifier)
+        with lock:
+            now = time.monotonic()
+            bucket = int(now // window)
             
-            # Получаем запросы для данного идентификатора
-            user_requests = self.requests[identifier]
+            state = requests.get(identifier)
+            if state is None:
+                if len(requests) >= self.shard_capacity:
+                    # Первый ключ - клиент, дольше всех не начинавший новое окно
+                    del requests[next(iter(requests))]
+                state = requests[identifier] = [0, 0, bucket]
+            elif state[2] != bucket:
+                # Началось новое окно: текущий счетчик становится предыдущим
+                state[0] = state[1] if state[2] == bucket - 1 else 0
+                state[1] = 0
+                state[2] = bucket
+                # Переносим в конец, чтобы вытеснялись неактивные клиенты
+                del requests[identifier]
+                requests[identifier] = state
             
-            # Удаляем старые запросы за пределами окна
-            user_requests[:] = [req_time for req_time in user_requests if req_time > window_start]
+            prev_count, curr_count = state[0], state[1]
+            bucket_start = bucket * window
+            estimated = prev_count * (1 - (now - bucket_start) / window) + curr_count
             
             # Проверяем лимит
-            if len(user_requests) >= self.max_requests:
-                # Вычисляем время сброса (когда истечет самый старый запрос)
-                reset_time = user_requests[0] + timedelta(seconds=self.window_seconds)
+            if estimated >= self.max_requests:
+                if curr_count < self.max_requests and prev_count:
+                    # Оценка опустится ниже лимита, когда вклад предыдущего окна уменьшится
+                    reset_time = bucket_start + window * (1 - (self.max_requests - curr_count) / prev_count)
+                else:
+                    reset_time = bucket_start + window
                 remaining = 0
                 allowed = False
             else:
-                # Добавляем текущий запрос
-                user_requests.append(now)
-                self.requests[identifier] = user_requests
-                remaining = self.max_requests - len(user_requests)
-                reset_time = now + timedelta(seconds=self.window_seconds)
+                # Учитываем текущий запрос
+                state[1] = curr_count + 1
+                remaining = max(0, int(self.max_requests - estimated - 1))
+                reset_time = bucket_start + window
                 allowed = True
             
             return allowed, remaining, reset_time
@@ -69,23 +125,31 @@ class RateLimiter:
         # Иначе используем IP адрес
         return f"ip:{request.remote_addr}"
     
+    def _cleanup_loop(self):
+        """Периодическая очистка раз в окно"""
+        while not self._stop_cleanup.wait(self.window_seconds):
+            try:
+                self.cleanup_old_entries()
+            except Exception as e:
+                logger.error('Rate limiter cleanup failed', exc_info=e)
+    
+    def stop_cleanup(self):
+        """Остановка фоновой очистки"""
+        self._stop_cleanup.set()
+    
     def cleanup_old_entries(self):
         """
         Очистка старых записей (для фоновой задачи)
         """
-        with self.lock:
-            now = datetime.now()
-            window_start = now - timedelta(seconds=self.window_seconds * 2)
-            
-            # Удаляем записи, которые полностью устарели
-            to_delete = []
-            for identifier, timestamps in self.requests.items():
-                timestamps[:] = [t for t in timestamps if t > window_start]
-                if not timestamps:
-                    to_delete.append(identifier)
-            
-            for identifier in to_delete:
-                del self.requests[identifier]
+        # Записи старше предыдущего окна больше не влияют на оценку
+        oldest_bucket = int(time.monotonic() // self.window_seconds) - 1
+        
+        # Каждый шард чистится под своим lock, остальные продолжают работать
+        for requests, lock in self.shards:
+            with lock:
+                to_delete = [identifier for identifier, state in requests.items() if state[2] < oldest_bucket]
+                for identifier in to_delete:
+                    del requests[identifier]
 
 # Глобальные rate limiters с разными лимитами
 # Общий лимит для всех запросов
@@ -112,6 +176,7 @@ def rate_limit(limiter=None):
         def wrapped(*args, **kwargs):
             identifier = limiter.get_identifier()
             allowed, remaining, reset_time = limiter.is_allowed(identifier)
+            reset_in = reset_time - time.monotonic()
             
             if not allowed:
                 logger.warning(
@@ -121,17 +186,19 @@ def rate_limit(limiter=None):
                     path=request.path
                 )
                 
-                return jsonify({
-                    'success': False,
-                    'error': {
-                        'code': 'RATE_LIMIT_EXCEEDED',
-                        'message': 'Too many requests. Please try again later.',
-                        'retry_after': int((reset_time - datetime.now()).total_seconds())
-                    }
-                }), 429
+                # Целые секунды с округлением вверх: клиент не повторит запрос раньше сброса
+                retry_after = str(max(1, math.ceil(reset_in)))
+                body = _RATE_LIMIT_JSON_PREFIX + retry_after.encode() + _RATE_LIMIT_JSON_SUFFIX
+                response = current_app.response_class(body, status=429, mimetype='application/json')
+                response.headers['Retry-After'] = retry_after
+                response.headers['X-RateLimit-Limit'] = str(limiter.max_requests)
+                response.headers['X-RateLimit-Remaining'] = '0'
+                response.headers['X-RateLimit-Reset'] = (datetime.now() + timedelta(seconds=reset_in)).isoformat()
+                return response
             
             # Добавляем заголовки rate limit
             response = f(*args, **kwargs)
+            reset_at = (datetime.now() + timedelta(seconds=reset_in)).isoformat()
             
             # Если response - это tuple (response, status_code)
             if isinstance(response, tuple):
@@ -139,13 +206,13 @@ def rate_limit(limiter=None):
                 if hasattr(resp_obj, 'headers'):
                     resp_obj.headers['X-RateLimit-Limit'] = str(limiter.max_requests)
                     resp_obj.headers['X-RateLimit-Remaining'] = str(remaining)
-                    resp_obj.headers['X-RateLimit-Reset'] = reset_time.isoformat()
+                    resp_obj.headers['X-RateLimit-Reset'] = reset_at
                 return resp_obj, status_code
             else:
                 if hasattr(response, 'headers'):
                     response.headers['X-RateLimit-Limit'] = str(limiter.max_requests)
                     response.headers['X-RateLimit-Remaining'] = str(remaining)
-                    response.headers['X-RateLimit-Reset'] = reset_time.isoformat()
+                    response.headers['X-RateLimit-Reset'] = reset_at
                 return response
         
         return wrapped
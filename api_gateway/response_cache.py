@@ -0,0 +1,214 @@
+"""
+Модуль для кэширования ответов в API Gateway
+"""
+import os
+import time
+import hashlib
+from functools import wraps
+import redis
+from flask import request, make_response, current_app
+from logger import logger
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+
+class ResponseCache:
+    """
+    Cache-aside кэш ответов идемпотентных GET запросов в Redis
+
+    Ключ строится по пути, параметрам запроса и заголовку Authorization,
+    поэтому пользователи никогда не получают чужие ответы. Рядом со свежей
+    копией хранится устаревшая, которая отдается, если сервис недоступен.
+
+    Инвалидация увеличивает номер поколения группы (INCR), а свежая копия
+    хранит поколение, прочитанное до запроса к сервису. Копия другого
+    поколения считается промахом: удалять ключи не нужно, и GET, начатый
+    до изменения, не вернет в кэш старый ответ.
+    """
+
+    def __init__(self, url=REDIS_URL, prefix='gateway', stale_ttl=300, retry_interval=5):
+        """
+        :param url: Адрес Redis (пустая строка отключает кэш)
+        :param prefix: Префикс ключей
+        :param stale_ttl: Время хранения устаревшей копии (секунды)
+        :param retry_interval: Пауза перед повторным обращением к Redis после ошибки (секунды)
+        """
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=0.2, socket_connect_timeout=0.2
+        ) if url else None
+        self.prefix = prefix
+        self.stale_ttl = stale_ttl
+        self.retry_interval = retry_interval
+        self._disabled_until = 0.0
+
+    @property
+    def available(self):
+        return self.client is not None and time.monotonic() >= self._disabled_until
+
+    def _fail(self, operation, exc):
+        # Кэш не должен ломать запросы: временно работаем без него
+        self._disabled_until = time.monotonic() + self.retry_interval
+        logger.warning('Response cache unavailable', operation=operation, error=str(exc))
+
+    def make_key(self):
+        """Хэш запроса: путь, отсортированные параметры и токен"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(request.path.encode())
+        for key, value in sorted(request.args.items(multi=True)):
+            digest.update(b'\0' + key.encode() + b'=' + value.encode())
+        digest.update(b'\0' + (request.headers.get('Authorization') or '').encode())
+        return digest.hexdigest()
+
+    def _fresh_key(self, namespace, key):
+        return f'{self.prefix}:cache:{namespace}:{key}'
+
+    def _stale_key(self, namespace, key):
+        return f'{self.prefix}:stale:{namespace}:{key}'
+
+    def _generation_key(self, namespace):
+        return f'{self.prefix}:gen:{namespace}'
+
+    @staticmethod
+    def _to_response(entry):
+        return current_app.response_class(
+            entry[b'body'],
+            status=int(entry[b'status']),
+            mimetype=entry[b'mimetype'].decode()
+        )
+
+    def get(self, namespace, key):
+        """
+        Свежая копия и текущее поколение группы за один round trip
+
+        Возвращает (ответ или None, поколение). Поколение передается в set:
+        None означает, что Redis недоступен и сохранять ответ не нужно.
+        """
+        if not self.available:
+            return None, None
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self._generation_key(namespace))
+            pipe.hgetall(self._fresh_key(namespace, key))
+            generation, entry = pipe.execute()
+        except redis.RedisError as e:
+            self._fail('get', e)
+            return None, None
+        generation = generation or b'0'
+        if not entry or entry.get(b'gen') != generation:
+            return None, generation
+        return self._to_response(entry), generation
+
+    def get_stale(self, namespace, key, generation):
+        """
+        Устаревшая копия текущего поколения
+
+        Копия, сохраненная до инвалидации группы, не отдается: после
+        изменения данных старый ответ хуже, чем ошибка сервиса.
+        """
+        if generation is None or not self.available:
+            return None
+        try:
+            entry = self.client.hgetall(self._stale_key(namespace, key))
+        except redis.RedisError as e:
+            self._fail('get', e)
+            return None
+        if not entry or entry.get(b'gen') != generation:
+            return None
+        return self._to_response(entry)
+
+    def set(self, namespace, key, response, ttl, generation):
+        if generation is None or not self.available:
+            return
+        entry = {
+            'body': response.get_data(),
+            'status': response.status_code,
+            'mimetype': response.mimetype or 'application/json',
+            'gen': generation
+        }
+        fresh_key = self._fresh_key(namespace, key)
+        stale_key = self._stale_key(namespace, key)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hset(fresh_key, mapping=entry)
+            pipe.expire(fresh_key, ttl)
+            pipe.hset(stale_key, mapping=entry)
+            pipe.expire(stale_key, self.stale_ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._fail('set', e)
+
+    def invalidate(self, *namespaces):
+        """
+        Новое поколение групп: свежие и устаревшие копии перестают читаться
+        и истекают по TTL
+        """
+        if not self.available:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for namespace in namespaces:
+                pipe.incr(self._generation_key(namespace))
+            pipe.execute()
+        except redis.RedisError as e:
+            self._fail('invalidate', e)
+
+
+response_cache = ResponseCache()
+
+
+def cached(namespace, ttl):
+    """
+    Декоратор кэширования ответов GET эндпоинтов
+
+    :param namespace: Группа ключей для инвалидации (users, orders, ...)
+    :param ttl: Время жизни свежей копии в секундах
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            key = response_cache.make_key()
+
+            # Поколение читается до запроса к сервису: если за это время
+            # группу инвалидируют, сохраненный ответ уже не будет прочитан
+            response, generation = response_cache.get(namespace, key)
+            if response is not None:
+                response.headers['X-Cache'] = 'hit'
+                return response
+
+            response = make_response(f(*args, **kwargs))
+
+            if response.status_code == 200:
+                response_cache.set(namespace, key, response, ttl, generation)
+                response.headers['X-Cache'] = 'miss'
+            elif response.status_code == 503:
+                # Сервис недоступен (circuit breaker открыт): отдаем последнюю известную копию
+                stale = response_cache.get_stale(namespace, key, generation)
+                if stale is not None:
+                    logger.warning('Serving stale cached response', namespace=namespace)
+                    stale.headers['X-Cache'] = 'stale'
+                    return stale
+
+            return response
+
+        return wrapped
+
+    return decorator
+
+
+def invalidates(*namespaces):
+    """
+    Декоратор для изменяющих эндпоинтов: сбрасывает кэш после успешного ответа
+
+    :param namespaces: Группы ключей, которые становятся неактуальными
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+            if response.status_code < 400:
+                response_cache.invalidate(*namespaces)
+            return response
+
+        return wrapped
+
+    return decorator
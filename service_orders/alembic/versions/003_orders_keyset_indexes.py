@@ -0,0 +1,28 @@
+"""Extend order date indexes with id for keyset pagination
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_orders_user_created', table_name='orders')
+    op.create_index('ix_orders_user_created', 'orders', ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_orders_created', 'orders', [sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_created', table_name='orders')
+    op.drop_index('ix_orders_user_created', table_name='orders')
+    op.create_index('ix_orders_user_created', 'orders', ['user_id', sa.text('created_at DESC')], unique=False)
@@ -0,0 +1,29 @@
+"""Indexes for status filters and per-user stats
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-01-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_status_created', 'orders', ['status', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_orders_user_status', 'orders', ['user_id', 'status'], unique=False, postgresql_include=['total_amount'])
+    # Поиск по user_id покрывают составные индексы, начинающиеся с user_id
+    op.drop_index('ix_orders_user_id', table_name='orders')
+
+
+def downgrade() -> None:
+    op.create_index('ix_orders_user_id', 'orders', ['user_id'], unique=False)
+    op.drop_index('ix_orders_user_status', table_name='orders')
+    op.drop_index('ix_orders_status_created', table_name='orders')
@@ -1,60 +1,187 @@
 from flask import Flask, request, jsonify, g
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
 import os
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
-from database import SessionLocal, init_db
+from sqlalchemy.orm import Session, raiseload
+from database import db_session as db, init_db
 from models import Order
-from auth import require_auth, require_role
+from auth import require_auth, require_role, authenticate_request, to_uuid, parse_uuid, current_user_uuid, UUIDConverter
 from schemas import OrderCreate, OrderUpdate, OrderStatusUpdate, OrderSearch
 from pydantic import ValidationError
-from logger import logger, log_request, log_response
-import uuid
+from logger import logger, log_request, log_response, new_request_id
 from decimal import Decimal
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, tuple_, select, update, lambda_stmt
+
+def json_default(value):
+    """Типы, которых нет в orjson: Decimal как число, остальное строкой"""
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+class ORJSONProvider(JSONProvider):
+    """JSON провайдер Flask на orjson: jsonify и request.json без stdlib json"""
+    
+    # UUID и datetime сериализуются в orjson; datetime без tz считается UTC и пишется с Z
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=json_default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Байты orjson отдаются как есть, без промежуточной str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=json_default, option=self.option),
+            mimetype='application/json'
+        )
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+app.url_map.converters['uuid'] = UUIDConverter
 CORS(app)
 
 PORT = int(os.environ.get('PORT', 8002))
 
+ZERO_AMOUNT = Decimal('0.00')
+
+def to_decimal(value):
+    """Decimal из числа JSON; float через str, чтобы не тянуть двоичную погрешность"""
+    return Decimal(str(value)) if isinstance(value, float) else Decimal(value)
+
+def to_quantity(value):
+    """Количество для умножения на Decimal: int как есть, float через to_decimal"""
+    return value if isinstance(value, int) else to_decimal(value)
+
+# Для списков заказов: ленивая загрузка связей (если они появятся) падает
+# с ошибкой, а не делает по запросу на каждый заказ; нужные связи
+# подгружаются явно через selectinload
+LIST_LOAD_OPTIONS = (raiseload('*'),)
+
+# Сортировки списка заказов: (sort_by, sort_order) -> выражения ORDER BY.
+# По дате сортируем с id для однозначного порядка, что позволяет пагинацию по курсору
+ORDER_SORTS = {
+    ('created_at', 'desc'): (Order.created_at.desc(), Order.id.desc()),
+    ('created_at', 'asc'): (Order.created_at.asc(), Order.id.asc()),
+    ('total_amount', 'desc'): (Order.total_amount.desc(),),
+    ('total_amount', 'asc'): (Order.total_amount.asc(),),
+}
+DEFAULT_ORDER_SORT = ('created_at', 'desc')
+
+# Колонки для ?fields=summary: все, кроме items
+ORDER_SUMMARY_COLUMNS = (Order.id, Order.user_id, Order.status, Order.total_amount, Order.created_at)
+
+def order_summary(row):
+    """Краткое представление заказа из строки with_entities"""
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'status': row.status,
+        'total_amount': row.total_amount,
+        'created_at': row.created_at
+    }
+
+# Тела status/health собраны заранее. Response каждый раз новый:
+# after_request и CORS дописывают в него заголовки
+STATUS_BODY = orjson.dumps({'status': 'Orders service is running'})
+HEALTH_BODY_PREFIX = b'{"status":"OK","service":"Orders Service","timestamp":"'
+
+# Дальше этого числа строк список без exact_count заказы не считает
+COUNT_LIMIT = 1000
+
+def count_orders(query, exact=False):
+    """
+    Число заказов в выборке или None, если их больше COUNT_LIMIT
+
+    Подсчет идет по подзапросу с LIMIT, так что на больших таблицах
+    COUNT не проходит по всем строкам ради номера последней страницы.
+    """
+    if exact:
+        return query.count()
+    capped = query.with_entities(Order.id).limit(COUNT_LIMIT + 1).subquery()
+    total = db.query(func.count()).select_from(capped).scalar()
+    return total if total <= COUNT_LIMIT else None
+
+ORDER_STATUSES = ('created', 'processing', 'completed', 'cancelled')
+
+def status_totals(query):
+    """Число заказов и суммы по статусам одним GROUP BY: (total_orders, by_status, amounts)"""
+    rows = query.with_entities(
+        Order.status, func.count(), func.sum(Order.total_amount)
+    ).group_by(Order.status).all()
+    
+    by_status = dict.fromkeys(ORDER_STATUSES, 0)
+    amounts = {}
+    for status, count, amount in rows:
+        if status in by_status:
+            by_status[status] = count
+        amounts[status] = amount or 0
+    return sum(row[1] for row in rows), by_status, amounts
+
+def get_order_by_id(order_uuid):
+    """Заказ по id или None; запрос собирается один раз и дальше берется из кэша lambda_stmt"""
+    return db.execute(lambda_stmt(lambda: select(Order).where(Order.id == order_uuid))).scalar_one_or_none()
+
+def invalid_order_id():
+    return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid order ID format'}}), 400
+
+def encode_cursor(order):
+    """Курсор keyset пагинации: позиция заказа в сортировке (created_at, id)"""
+    return f'{order.created_at.isoformat()}_{order.id}'
+
+def decode_cursor(cursor):
+    """Разбор курсора; ValueError при неверном формате"""
+    created_at, order_id = cursor.split('_', 1)
+    return datetime.fromisoformat(created_at), to_uuid(order_id)
+
 @app.before_request
 def before_request():
     """Обработка запроса до маршрутизации"""
-    request_id = request.headers.get('X-Request-ID', str(uuid.uuid4()))
+    request_id = request.headers.get('X-Request-ID') or new_request_id()
     g.request_id = request_id
-    request.request_id = request_id
     log_request()
 
+# Токен проверяется здесь, require_auth и require_role только читают результат
+app.before_request(authenticate_request)
+
 @app.after_request
 def after_request(response):
     """Обработка ответа"""
     return log_response(response)
 
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """Возврат соединения в пул после запроса"""
+    db.remove()
+
 @app.route('/orders/status', methods=['GET'])
 def status():
     """Status endpoint"""
-    return jsonify({'status': 'Orders service is running'}), 200
+    return app.response_class(STATUS_BODY, status=200, mimetype='application/json')
 
 @app.route('/orders/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'OK',
-        'service': 'Orders Service',
-        'timestamp': datetime.utcnow().isoformat() + 'Z'
-    }), 200
+    body = HEALTH_BODY_PREFIX + time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()).encode() + b'"}'
+    return app.response_class(body, status=200, mimetype='application/json')
 
-@app.route('/v1/orders/<order_id>', methods=['GET'])
+@app.route('/v1/orders/<uuid:order_uuid>', methods=['GET'])
 @require_auth
-def get_order(order_id):
+def get_order(order_uuid):
     """Получение заказа по ID"""
-    db = SessionLocal()
+    if order_uuid is None:
+        return invalid_order_id()
+    
     try:
         user_id = request.user.get('user_id')
         user_roles = request.user.get('roles', [])
         
-        order = db.query(Order).filter(Order.id == uuid.UUID(order_id)).first()
+        order = get_order_by_id(order_uuid)
         if not order:
             return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'Order not found'}}), 404
         
@@ -62,18 +189,13 @@ def get_order(order_id):
             return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': 'Access denied'}}), 403
         
         return jsonify({'success': True, 'data': order.to_dict()}), 200
-    except ValueError:
-        return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid order ID format'}}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
 @app.route('/v1/orders', methods=['GET'])
 @require_auth
 def get_orders():
     """Получение списка заказов с фильтрацией и пагинацией"""
-    db = SessionLocal()
     try:
         user_id = request.user.get('user_id')
         user_roles = request.user.get('roles', [])
@@ -81,14 +203,14 @@ def get_orders():
         query = db.query(Order)
         
         if 'admin' not in user_roles:
-            query = query.filter(Order.user_id == uuid.UUID(user_id))
+            query = query.filter(Order.user_id == current_user_uuid())
         else:
             filter_user_id = request.args.get('userId')
             if filter_user_id:
-                try:
-                    query = query.filter(Order.user_id == uuid.UUID(filter_user_id))
-                except ValueError:
+                filter_uuid = parse_uuid(filter_user_id)
+                if filter_uuid is None:
                     return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid user ID format'}}), 400
+                query = query.filter(Order.user_id == filter_uuid)
         
         status_filter = request.args.get('status')
         if status_filter:
@@ -108,44 +230,63 @@ def get_orders():
             except:
                 pass
         
-        sort_by = request.args.get('sort_by', 'created_at')
-        sort_order = request.args.get('sort_order', 'desc')
+        sort_order = 'desc' if request.args.get('sort_order', 'desc') == 'desc' else 'asc'
+        sort_key = (request.args.get('sort_by', 'created_at'), sort_order)
+        if sort_key not in ORDER_SORTS:
+            sort_key = DEFAULT_ORDER_SORT
         
-        if sort_by == 'created_at':
-            query = query.order_by(Order.created_at.desc() if sort_order == 'desc' else Order.created_at.asc())
-        elif sort_by == 'total_amount':
-            query = query.order_by(Order.total_amount.desc() if sort_order == 'desc' else Order.total_amount.asc())
-        else:
-            query = query.order_by(Order.created_at.desc())
-        
-        total = query.count()
+        total = count_orders(query, exact=request.args.get('exact_count') == 'true')
         
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 10)), 100)
-        offset = (page - 1) * per_page
         
-        orders = query.offset(offset).limit(per_page).all()
+        query = query.order_by(*ORDER_SORTS[sort_key])
+        keyset = sort_key[0] == 'created_at'
+        descending = sort_key[1] == 'desc'
+        
+        summary = request.args.get('fields') == 'summary'
+        if summary:
+            # Без JSON колонки items и без создания ORM объектов
+            query = query.with_entities(*ORDER_SUMMARY_COLUMNS)
+        else:
+            query = query.options(*LIST_LOAD_OPTIONS)
+        
+        cursor = request.args.get('cursor')
+        if cursor and keyset:
+            # Keyset: продолжаем с позиции последнего заказа вместо OFFSET
+            try:
+                cursor_position = tuple_(*decode_cursor(cursor))
+            except ValueError:
+                return jsonify({'success': False, 'error': {'code': 'INVALID_CURSOR', 'message': 'Invalid pagination cursor'}}), 400
+            position = tuple_(Order.created_at, Order.id)
+            query = query.filter(position < cursor_position if descending else position > cursor_position)
+            orders = query.limit(per_page).all()
+        else:
+            orders = query.offset((page - 1) * per_page).limit(per_page).all()
+        
+        pagination = {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page if total is not None else None
+        }
+        if total is None:
+            pagination['total_at_least'] = COUNT_LIMIT + 1
+        if keyset:
+            pagination['next_cursor'] = encode_cursor(orders[-1]) if len(orders) == per_page else None
         
         return jsonify({
             'success': True,
-            'data': [order.to_dict() for order in orders],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page
-            }
+            'data': [order_summary(row) for row in orders] if summary else [order.to_dict() for order in orders],
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
 @app.route('/v1/orders', methods=['POST'])
 @require_auth
 def create_order():
     """Создание нового заказа"""
-    db = SessionLocal()
     try:
         order_data = request.json
         user_id_from_token = request.user.get('user_id')
@@ -161,29 +302,27 @@ def create_order():
                 }
             }), 400
         
-        total_amount = Decimal('0.00')
-        items = [item.dict() for item in order_create.items]
+        items = order_create.items
+        # price уже Decimal после валидации схемы, quantity - int
+        total_amount = sum((item.price * item.quantity for item in items), ZERO_AMOUNT)
         
         # Convert Decimal to float for JSON serialization
-        items_for_db = []
-        for item in items:
-            total_amount += Decimal(str(item['price'])) * Decimal(str(item['quantity']))
-            items_for_db.append({
-                'product': item['product'],
-                'quantity': item['quantity'],
-                'price': float(item['price'])
-            })
+        items_for_db = [
+            {'product': item.product, 'quantity': item.quantity, 'price': float(item.price)}
+            for item in items
+        ]
         
         new_order = Order(
-            user_id=uuid.UUID(user_id_from_token),
+            user_id=current_user_uuid(),
             items=items_for_db,
             status='created',
             total_amount=total_amount
         )
         
+        # Один INSERT без RETURNING и SELECT: id и даты заполняются на стороне
+        # приложения и после commit остаются на объекте (expire_on_commit=False)
         db.add(new_order)
         db.commit()
-        db.refresh(new_order)
         
         logger.info(
             'Order created successfully',
@@ -201,68 +340,90 @@ def create_order():
         db.rollback()
         logger.error('Order creation failed', exc_info=e, user_id=user_id_from_token)
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
-@app.route('/v1/orders/<order_id>', methods=['PUT'])
+@app.route('/v1/orders/<uuid:order_uuid>', methods=['PUT'])
 @require_auth
-def update_order(order_id):
+def update_order(order_uuid):
     """Обновление заказа"""
-    db = SessionLocal()
+    if order_uuid is None:
+        return invalid_order_id()
+    
     try:
         user_id = request.user.get('user_id')
-        user_roles = request.user.get('roles', [])
-        
-        order = db.query(Order).filter(Order.id == uuid.UUID(order_id)).first()
-        if not order:
-            return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'Order not found'}}), 404
-        
-        if 'admin' not in user_roles and str(order.user_id) != user_id:
-            return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': 'Access denied'}}), 403
+        is_admin = 'admin' in request.user.get('roles', [])
         
         order_data = request.json
         
-        if 'admin' not in user_roles:
+        forbidden = None
+        if not is_admin:
             if 'status' in order_data and order_data['status'] != 'cancelled':
-                return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': 'Only cancellation allowed'}}), 403
-            if 'items' in order_data:
-                return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': 'Cannot modify items'}}), 403
-        
+                forbidden = 'Only cancellation allowed'
+            elif 'items' in order_data:
+                forbidden = 'Cannot modify items'
+        if forbidden:
+            # Как и раньше, сначала 404 и чужой заказ, затем запрет по содержимому
+            order = get_order_by_id(order_uuid)
+            if order is None:
+                return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'Order not found'}}), 404
+            if str(order.user_id) != user_id:
+                return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': 'Access denied'}}), 403
+            return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': forbidden}}), 403
+        
+        changes = {}
         if 'status' in order_data:
-            order.status = order_data['status']
-        if 'items' in order_data and 'admin' in user_roles:
+            changes['status'] = order_data['status']
+        if 'items' in order_data and is_admin:
+            items = order_data['items']
+            if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+                return jsonify({'success': False, 'error': {'code': 'VALIDATION_ERROR', 'message': 'Items must be a list of objects'}}), 400
+            numeric = (int, float)
+            if not all(isinstance(item.get('price', 0), numeric) and isinstance(item.get('quantity', 0), numeric) for item in items):
+                return jsonify({'success': False, 'error': {'code': 'VALIDATION_ERROR', 'message': 'Item price and quantity must be numbers'}}), 400
+            
             # Convert Decimal to float for JSON serialization
-            items_for_db = []
-            total_amount = Decimal('0.00')
-            for item in order_data['items']:
-                total_amount += Decimal(str(item.get('price', 0))) * Decimal(str(item.get('quantity', 0)))
-                items_for_db.append({
-                    'product': item.get('product'),
-                    'quantity': item.get('quantity'),
-                    'price': float(item.get('price', 0))
-                })
-            order.items = items_for_db
-            order.total_amount = total_amount
+            changes['items'] = [
+                {'product': item.get('product'), 'quantity': item.get('quantity'), 'price': float(item.get('price', 0))}
+                for item in items
+            ]
+            # Decimal * int точен, поэтому целое количество не переводится в Decimal
+            changes['total_amount'] = sum(
+                (to_decimal(item.get('price', 0)) * to_quantity(item.get('quantity', 0)) for item in items),
+                ZERO_AMOUNT
+            )
+        
+        if changes:
+            # Один UPDATE ... RETURNING вместо SELECT + UPDATE; чужой заказ не подходит под WHERE
+            stmt = update(Order).where(Order.id == order_uuid)
+            if not is_admin:
+                stmt = stmt.where(Order.user_id == current_user_uuid())
+            order = db.execute(stmt.values(**changes).returning(Order)).scalar_one_or_none()
+        else:
+            order = get_order_by_id(order_uuid)
+            if order is not None and not is_admin and str(order.user_id) != user_id:
+                order = None
+        
+        if order is None:
+            # Заказа нет или он чужой: различаем только на пути ошибки
+            if get_order_by_id(order_uuid) is not None:
+                return jsonify({'success': False, 'error': {'code': 'FORBIDDEN', 'message': 'Access denied'}}), 403
+            return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'Order not found'}}), 404
         
         db.commit()
-        db.refresh(order)
         
         return jsonify({'success': True, 'data': order.to_dict()}), 200
-    except ValueError:
-        return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid order ID format'}}), 400
     except Exception as e:
         db.rollback()
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
-@app.route('/v1/orders/<order_id>', methods=['DELETE'])
+@app.route('/v1/orders/<uuid:order_uuid>', methods=['DELETE'])
 @require_role('admin')
-def delete_order(order_id):
+def delete_order(order_uuid):
     """Удаление заказа"""
-    db = SessionLocal()
+    if order_uuid is None:
+        return invalid_order_id()
+    
     try:
-        order = db.query(Order).filter(Order.id == uuid.UUID(order_id)).first()
+        order = get_order_by_id(order_uuid)
         if not order:
             return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'Order not found'}}), 404
         
@@ -271,19 +432,18 @@ def delete_order(order_id):
         db.commit()
         
         return jsonify({'success': True, 'data': {'message': 'Order deleted', 'deletedOrder': order_dict}}), 200
-    except ValueError:
-        return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid order ID format'}}), 400
     except Exception as e:
         db.rollback()
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
-@app.route('/v1/orders/<order_id>/status', methods=['PUT'])
+@app.route('/v1/orders/<uuid:order_uuid>/status', methods=['PUT'])
 @require_auth
-def update_order_status(order_id):
+def update_order_status(order_uuid):
     """Обновление только статуса заказа"""
-    db = SessionLocal()
+    if order_uuid is None:
+        logger.warning('Invalid order UUID', path=request.path)
+        return invalid_order_id()
+    
     try:
         user_id = request.user.get('user_id')
         user_roles = request.user.get('roles', [])
@@ -300,7 +460,7 @@ def update_order_status(order_id):
                 }
             }), 400
         
-        order = db.query(Order).filter(Order.id == uuid.UUID(order_id)).first()
+        order = get_order_by_id(order_uuid)
         if not order:
             return jsonify({
                 'success': False,
@@ -331,7 +491,6 @@ def update_order_status(order_id):
         old_status = order.status
         order.status = status_update.status
         db.commit()
-        db.refresh(order)
         
         logger.info(
             'Order status updated',
@@ -346,18 +505,9 @@ def update_order_status(order_id):
             'success': True,
             'data': order.to_dict()
         }), 200
-    except ValueError:
-        logger.warning('Invalid order UUID', order_id=order_id)
-        return jsonify({
-            'success': False,
-            'error': {
-                'code': 'INVALID_UUID',
-                'message': 'Invalid order ID format'
-            }
-        }), 400
     except Exception as e:
         db.rollback()
-        logger.error('Order status update failed', exc_info=e, order_id=order_id)
+        logger.error('Order status update failed', exc_info=e, order_id=str(order_uuid))
         return jsonify({
             'success': False,
             'error': {
@@ -365,37 +515,24 @@ def update_order_status(order_id):
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 @app.route('/v1/orders/stats', methods=['GET'])
 @require_role('admin')
 def get_order_stats():
     """Получение статистики по заказам (только admin)"""
-    db = SessionLocal()
     try:
-        total_orders = db.query(Order).count()
-        
-        created_count = db.query(Order).filter(Order.status == 'created').count()
-        processing_count = db.query(Order).filter(Order.status == 'processing').count()
-        completed_count = db.query(Order).filter(Order.status == 'completed').count()
-        cancelled_count = db.query(Order).filter(Order.status == 'cancelled').count()
+        total_orders, by_status, amounts = status_totals(db.query(Order))
         
-        total_revenue = db.query(func.sum(Order.total_amount)).filter(Order.status == 'completed').scalar() or 0
-        avg_order_value = db.query(func.avg(Order.total_amount)).scalar() or 0
+        total_revenue = amounts.get('completed', 0)
+        avg_order_value = sum(amounts.values()) / total_orders if total_orders else 0
         
-        recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(5).all()
+        recent_orders = db.query(Order).options(*LIST_LOAD_OPTIONS).order_by(Order.created_at.desc()).limit(5).all()
         
         return jsonify({
             'success': True,
             'data': {
                 'total_orders': total_orders,
-                'by_status': {
-                    'created': created_count,
-                    'processing': processing_count,
-                    'completed': completed_count,
-                    'cancelled': cancelled_count
-                },
+                'by_status': by_status,
                 'revenue': {
                     'total': float(total_revenue),
                     'average_order_value': float(avg_order_value)
@@ -411,39 +548,26 @@ def get_order_stats():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 @app.route('/v1/orders/my-stats', methods=['GET'])
 @require_auth
 def get_my_order_stats():
     """Получение статистики по своим заказам"""
-    db = SessionLocal()
     try:
         user_id = request.user.get('user_id')
         
-        query = db.query(Order).filter(Order.user_id == uuid.UUID(user_id))
-        
-        total_orders = query.count()
-        created_count = query.filter(Order.status == 'created').count()
-        processing_count = query.filter(Order.status == 'processing').count()
-        completed_count = query.filter(Order.status == 'completed').count()
-        cancelled_count = query.filter(Order.status == 'cancelled').count()
+        query = db.query(Order).filter(Order.user_id == current_user_uuid())
         
-        total_spent = query.filter(Order.status == 'completed').with_entities(func.sum(Order.total_amount)).scalar() or 0
+        total_orders, by_status, amounts = status_totals(query)
+        total_spent = amounts.get('completed', 0)
         
-        recent_orders = query.order_by(Order.created_at.desc()).limit(5).all()
+        recent_orders = query.options(*LIST_LOAD_OPTIONS).order_by(Order.created_at.desc()).limit(5).all()
         
         return jsonify({
             'success': True,
             'data': {
                 'total_orders': total_orders,
-                'by_status': {
-                    'created': created_count,
-                    'processing': processing_count,
-                    'completed': completed_count,
-                    'cancelled': cancelled_count
-                },
+                'by_status': by_status,
                 'total_spent': float(total_spent),
                 'recent_orders': [order.to_dict() for order in recent_orders]
             }
@@ -456,8 +580,6 @@ def get_my_order_stats():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 if __name__ == '__main__':
     print(f'Orders service running on port {PORT}')
@@ -1,22 +1,136 @@
 """Утилиты для проверки JWT токенов в сервисе заказов"""
 import os
+import re
+import time
+import uuid
+import base64
+import hashlib
+import hmac
+import threading
 import jwt
-from functools import wraps
-from flask import request, jsonify
+import orjson
+from cachetools import TTLCache
+from functools import wraps, lru_cache
+from flask import request, jsonify, g
+from werkzeug.routing import BaseConverter
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 
+# Заголовок, который PyJWT ставит по умолчанию при подписи HS256 в service_users
+_HS256_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=').decode()
+# HMAC с уже подготовленным ключом: на каждый токен только copy(), без повторной подготовки ключа
+_HMAC_TEMPLATE = hmac.new(JWT_SECRET.encode(), None, hashlib.sha256)
+
+# Кэш проверенных токенов: повторные запросы с тем же токеном не проверяют подпись заново
+_token_cache = TTLCache(maxsize=10000, ttl=60)
+_token_cache_lock = threading.Lock()
+
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+
+
+@lru_cache(maxsize=4096)
+def _cached_uuid(value):
+    return uuid.UUID(value)
+
+
+def parse_uuid(value):
+    """UUID из строки в каноническом формате или None, без исключений"""
+    if not isinstance(value, str) or not _UUID_RE.match(value):
+        return None
+    return _cached_uuid(value)
+
+
+class UUIDConverter(BaseConverter):
+    """
+    Конвертер URL: UUID разбирается один раз при маршрутизации
+
+    В отличие от встроенного uuid конвертера Werkzeug, неверный формат
+    не дает 404: в обработчик приходит None, и он отвечает 400 INVALID_UUID.
+    """
+
+    def to_python(self, value):
+        return parse_uuid(value)
+
+    def to_url(self, value):
+        return str(value)
+
+
+def to_uuid(value):
+    """UUID из строки в каноническом формате; ValueError при неверном формате"""
+    parsed = parse_uuid(value)
+    if parsed is None:
+        raise ValueError(f'Invalid UUID: {value!r}')
+    return parsed
+
+
+def current_user_uuid():
+    """UUID пользователя из токена, разбирается один раз за запрос"""
+    user_uuid = getattr(g, 'user_uuid', None)
+    if user_uuid is None:
+        user_uuid = g.user_uuid = to_uuid(request.user.get('user_id'))
+    return user_uuid
+
+
+def _verify_hs256(token):
+    """
+    Быстрая проверка HS256 токена через hmac или None
+
+    Принимает только то, что принял бы и jwt.decode: стандартный заголовок,
+    точное совпадение подписи, целый exp в будущем, целый iat не из будущего,
+    без nbf и aud. Во всех остальных случаях возвращает None, и токен
+    проверяет PyJWT со своими сообщениями об ошибках.
+    """
+    header, _, rest = token.partition('.')
+    if header != _HS256_HEADER:
+        return None
+    payload_segment, sep, signature = rest.partition('.')
+    if not sep or '.' in signature:
+        return None
+    
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(token[:len(header) + 1 + len(payload_segment)].encode())
+    expected = base64.urlsafe_b64encode(mac.digest()).rstrip(b'=')
+    if not hmac.compare_digest(signature.encode(), expected):
+        return None
+    
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(payload_segment + '=' * (-len(payload_segment) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or 'nbf' in payload or 'aud' in payload:
+        return None
+    
+    now = time.time()
+    exp, iat = payload.get('exp'), payload.get('iat')
+    if type(exp) is not int or exp <= now:
+        return None
+    if iat is not None and (type(iat) is not int or iat > now):
+        return None
+    return payload
+
 
 def decode_token(token: str) -> dict:
     """Декодирование JWT токена"""
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload.get('exp', 0) > time.time():
         return payload
-    except jwt.ExpiredSignatureError:
-        raise Exception('Token expired')
-    except jwt.InvalidTokenError:
-        raise Exception('Invalid token')
+    
+    payload = _verify_hs256(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            raise Exception('Token expired')
+        except jwt.InvalidTokenError:
+            raise Exception('Invalid token')
+    
+    # Невалидные токены не кэшируются; запись живет не дольше 60 секунд и до exp
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
 
 
 def get_token_from_header() -> str:
@@ -25,30 +139,54 @@ def get_token_from_header() -> str:
     if not auth_header:
         raise Exception('Authorization header missing')
     
-    parts = auth_header.split()
+    # Разделители те же, что у split() (пробелы, табуляции, их повторы),
+    # но строка режется не больше двух раз: длинный хвост не дробится
+    parts = auth_header.split(None, 2)
     if len(parts) != 2 or parts[0].lower() != 'bearer':
         raise Exception('Invalid authorization header format')
     
     return parts[1]
 
 
+# Служебные эндпоинты без токена: для них заголовок не разбирается
+PUBLIC_PATHS = frozenset({'/orders/status', '/orders/health'})
+
+
+def authenticate_request():
+    """
+    Разбор токена один раз за запрос (before_request)
+
+    Результат кладется в request.user, причина отказа - в g.auth_error;
+    декораторы ниже только проверяют их.
+    """
+    request.user = None
+    g.auth_error = None
+    if request.path in PUBLIC_PATHS:
+        return
+    
+    try:
+        request.user = decode_token(get_token_from_header())
+    except Exception as e:
+        g.auth_error = str(e)
+
+
+def unauthorized():
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': 'UNAUTHORIZED',
+            'message': g.get('auth_error') or 'Authorization header missing'
+        }
+    }), 401
+
+
 def require_auth(f):
     """Декоратор для защиты эндпоинтов"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        try:
-            token = get_token_from_header()
-            payload = decode_token(token)
-            request.user = payload
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': {
-                    'code': 'UNAUTHORIZED',
-                    'message': str(e)
-                }
-            }), 401
+        if not request.user:
+            return unauthorized()
+        return f(*args, **kwargs)
     return decorated_function
 
 
@@ -57,29 +195,19 @@ def require_role(*allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            try:
-                token = get_token_from_header()
-                payload = decode_token(token)
-                user_roles = payload.get('roles', [])
-                
-                if not any(role in user_roles for role in allowed_roles):
-                    return jsonify({
-                        'success': False,
-                        'error': {
-                            'code': 'FORBIDDEN',
-                            'message': 'Insufficient permissions'
-                        }
-                    }), 403
-                
-                request.user = payload
-                return f(*args, **kwargs)
-            except Exception as e:
+            if not request.user:
+                return unauthorized()
+            
+            user_roles = request.user.get('roles', [])
+            if not any(role in user_roles for role in allowed_roles):
                 return jsonify({
                     'success': False,
                     'error': {
-                        'code': 'UNAUTHORIZED',
-                        'message': str(e)
+                        'code': 'FORBIDDEN',
+                        'message': 'Insufficient permissions'
                     }
-                }), 401
+                }), 403
+            
+            return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -4,4 +4,4 @@ echo "Инициализация базы данных..."
 python init_db.py
 
 echo "Запуск приложения..."
-python app.py
+exec gunicorn -c gunicorn.conf.py app:app
@@ -0,0 +1,17 @@
+"""Конфигурация gunicorn для сервиса заказов"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8002)}"
+
+# Обработчики ждут PostgreSQL: потоки внутри воркера перекрывают это ожидание
+worker_class = 'gthread'
+workers = int(os.environ.get('ORDERS_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('ORDERS_THREADS', 4))
+
+# Пул соединений SQLAlchemy свой в каждом воркере: не меньше числа потоков
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
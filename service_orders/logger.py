@@ -1,15 +1,97 @@
 """
 Модуль для структурированного логирования в Service Orders
 """
+import atexit
 import logging
-import json
+import os
+import orjson
+import queue
 import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from flask import request, g
 import traceback
 
+class RecordQueueHandler(QueueHandler):
+    """Кладет запись в очередь как есть: JSON собирается уже в потоке listener'а"""
+    
+    def prepare(self, record):
+        return record
+
+# Предел строк в буфере: при длинной очереди запись идет пачками этого размера
+LOG_BATCH_LINES = 256
+
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler, копящий строки до flush
+
+    Обычный StreamHandler делает write и flush на каждую запись. Здесь
+    строки собираются в список и уходят в stream одной записью, когда
+    listener разобрал очередь или набралось LOG_BATCH_LINES строк.
+    """
+    
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self.lines = []
+    
+    def emit(self, record):
+        try:
+            self.lines.append(self.format(record) + self.terminator)
+            if len(self.lines) >= LOG_BATCH_LINES:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        with self.lock:
+            if self.lines:
+                self.stream.write(''.join(self.lines))
+                self.lines.clear()
+            super().flush()
+
+class RecordQueueListener(QueueListener):
+    """
+    Listener, принимающий кроме LogRecord готовые кортежи событий
+
+    Кортеж (level, message, created, extra) кладет info_request. LogRecord
+    для него создается уже здесь, в фоновом потоке, так что в потоке
+    запроса остается одна запись в очередь.
+    """
+    
+    def __init__(self, queue, logger, *handlers, **kwargs):
+        super().__init__(queue, *handlers, **kwargs)
+        self.logger = logger
+    
+    def prepare(self, record):
+        if type(record) is tuple:
+            level, message, created, extra = record
+            record = self.logger.makeRecord(
+                self.logger.name, level, '', 0, message, (), None,
+                extra={'structured': extra}
+            )
+            # Время события, а не момента разбора очереди
+            record.created = created
+        return record
+    
+    def handle(self, record):
+        super().handle(record)
+        # Очередь пуста: накопленное пишется в stdout одним write
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
 class StructuredLogger:
-    """Класс для структурированного логирования в JSON формате"""
+    """
+    Класс для структурированного логирования в JSON формате
+
+    Обработчик запроса только кладет запись в очередь; форматирование и
+    запись в stdout выполняет фоновый поток QueueListener.
+
+    Уровень проверяется до сбора контекста: отключенный вызов ничего не
+    читает из request и не создает словарей. Сам контекст собирается сразу,
+    в потоке запроса: в потоке listener'а request уже недоступен.
+    """
     
     def __init__(self, name, level=logging.INFO):
         self.logger = logging.getLogger(name)
@@ -19,15 +101,23 @@ class StructuredLogger:
         self.logger.handlers = []
         
         # Создаем handler для вывода в консоль
-        handler = logging.StreamHandler(sys.stdout)
+        handler = BatchStreamHandler(sys.stdout)
         handler.setLevel(level)
         
         # Используем JSON formatter
         formatter = JsonFormatter()
         handler.setFormatter(formatter)
         
-        self.logger.addHandler(handler)
+        self.queue = queue.SimpleQueue()
+        self.logger.addHandler(RecordQueueHandler(self.queue))
         self.logger.propagate = False
+        
+        self.listener = RecordQueueListener(self.queue, self.logger, handler, respect_handler_level=True)
+        self.listener.start()
+        # При остановке дописываем то, что осталось в очереди, затем буфер
+        # handler'а (atexit вызывает функции в обратном порядке)
+        atexit.register(handler.flush)
+        atexit.register(self.listener.stop)
     
     def _get_context(self):
         """Получение контекстной информации из запроса"""
@@ -53,12 +143,27 @@ class StructuredLogger:
     
     def info(self, message, **kwargs):
         """Логирование информационного сообщения"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         extra = self._get_context()
         extra.update(kwargs)
         self.logger.info(message, extra={'structured': extra})
     
+    def info_request(self, message, extra):
+        """
+        Логирование с готовым словарем контекста, без _get_context
+
+        Используется для сообщений на каждый запрос: в очередь уходит
+        кортеж, LogRecord собирает RecordQueueListener.
+        """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        self.queue.put((logging.INFO, message, time.time(), extra))
+    
     def error(self, message, exc_info=None, **kwargs):
         """Логирование ошибки"""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
         extra = self._get_context()
         extra.update(kwargs)
         
@@ -73,22 +178,30 @@ class StructuredLogger:
     
     def warning(self, message, **kwargs):
         """Логирование предупреждения"""
+        if not self.logger.isEnabledFor(logging.WARNING):
+            return
         extra = self._get_context()
         extra.update(kwargs)
         self.logger.warning(message, extra={'structured': extra})
     
     def debug(self, message, **kwargs):
         """Логирование отладочной информации"""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         extra = self._get_context()
         extra.update(kwargs)
         self.logger.debug(message, extra={'structured': extra})
 
+# datetime без tz считается UTC и пишется с суффиксом Z
+LOG_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
 class JsonFormatter(logging.Formatter):
     """Formatter для вывода логов в JSON формате"""
     
     def format(self, record):
         log_data = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            # Время события, а не момента записи в потоке listener'а; в ISO с Z его переводит orjson
+            'timestamp': datetime.utcfromtimestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -107,27 +220,30 @@ class JsonFormatter(logging.Formatter):
                 'traceback': self.formatException(record.exc_info)
             }
         
-        return json.dumps(log_data, ensure_ascii=False)
+        return orjson.dumps(log_data, default=str, option=LOG_JSON_OPTIONS).decode()
 
 # Создаем глобальный экземпляр логгера
 logger = StructuredLogger('service_orders')
 
+def new_request_id():
+    """X-Request-ID для запроса без заголовка: UUID v4 строкой из os.urandom"""
+    h = os.urandom(16).hex()
+    return f'{h[:8]}-{h[8:12]}-4{h[13:16]}-{"89ab"[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}'
+
 def log_request():
     """Middleware для логирования входящих запросов"""
-    from flask import g
-    
-    # Получаем request_id из заголовков
-    request_id = request.headers.get('X-Request-ID', 'unknown')
-    g.request_id = request_id
+    # request_id уже выставлен в before_request
+    request_id = g.request_id
     
-    # Логируем входящий запрос
-    logger.info(
-        'Incoming request',
-        method=request.method,
-        path=request.path,
-        query_params=dict(request.args),
-        request_id=request_id
-    )
+    # Логируем входящий запрос. Контекст собирается одним словарем: request
+    # здесь всегда есть, а request.user появляется только после аутентификации
+    logger.info_request('Incoming request', {
+        'request_id': request_id,
+        'method': request.method,
+        'path': request.path,
+        'remote_addr': request.remote_addr,
+        'query_params': request.args.to_dict() if request.args else None
+    })
 
 def log_response(response):
     """Middleware для логирования ответов"""
@@ -135,11 +251,19 @@ def log_response(response):
     if hasattr(g, 'request_id'):
         response.headers['X-Request-ID'] = g.request_id
     
-    # Логируем ответ
-    logger.info(
-        'Outgoing response',
-        status_code=response.status_code,
-        content_length=response.content_length
-    )
+    # Логируем ответ: тот же контекст, что собрал бы _get_context
+    extra = {
+        'request_id': g.get('request_id'),
+        'method': request.method,
+        'path': request.path,
+        'remote_addr': request.remote_addr
+    }
+    user = getattr(request, 'user', None)
+    if user:
+        extra['user_id'] = user.get('user_id')
+        extra['user_email'] = user.get('email')
+    extra['status_code'] = response.status_code
+    extra['content_length'] = response.content_length
+    logger.info_request('Outgoing response', extra)
     
     return response
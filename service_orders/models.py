@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Numeric, JSON
+from sqlalchemy import Column, String, DateTime, Numeric, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from database import Base
 
@@ -8,21 +8,37 @@ class Order(Base):
     __tablename__ = 'orders'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
     items = Column(JSON, nullable=False)
     status = Column(String, default='created', nullable=False)
     total_amount = Column(Numeric(10, 2), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Список заказов по дате: range scan по индексу вместо сортировки,
+        # id замыкает ключ keyset пагинации (created_at, id)
+        Index('ix_orders_user_created', 'user_id', created_at.desc(), id.desc()),
+        Index('ix_orders_created', created_at.desc(), id.desc()),
+        Index('ix_orders_status_created', 'status', created_at.desc(), id.desc()),
+        # Статистика пользователя (GROUP BY status) читается только из индекса
+        Index('ix_orders_user_status', 'user_id', 'status', postgresql_include=['total_amount']),
+    )
+
     def to_dict(self):
-        """Преобразование модели в словарь"""
+        """
+        Преобразование модели в словарь
+
+        UUID, datetime и Decimal остаются объектами: их сериализует orjson
+        провайдер приложения (datetime в ISO формате с суффиксом Z,
+        Decimal числом через json_default).
+        """
         return {
-            'id': str(self.id),
-            'user_id': str(self.user_id),
+            'id': self.id,
+            'user_id': self.user_id,
             'items': self.items,
             'status': self.status,
-            'total_amount': float(self.total_amount),
-            'created_at': self.created_at.isoformat() + 'Z',
-            'updated_at': self.updated_at.isoformat() + 'Z'
+            'total_amount': self.total_amount,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
@@ -1,25 +1,35 @@
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
 from decimal import Decimal
 from datetime import datetime
 
+# Шаг округления цены, создается один раз
+CENT = Decimal('0.01')
+
+# Допустимые статусы заказа: Literal проверяется сравнением со списком
+# значений в pydantic-core, без регулярного выражения
+OrderStatus = Literal['created', 'processing', 'completed', 'cancelled']
+
 class OrderItem(BaseModel):
     """Схема позиции заказа"""
     product: str = Field(..., min_length=1, max_length=200)
     quantity: int = Field(..., gt=0, le=10000)
     price: Decimal = Field(..., gt=0, le=1000000)
     
-    @validator('product')
+    @field_validator('product')
+    @classmethod
     def validate_product(cls, v):
-        if not v or not v.strip():
+        v = v.strip()
+        if not v:
             raise ValueError('Product name cannot be empty')
-        return v.strip()
+        return v
     
-    @validator('price')
+    @field_validator('price')
+    @classmethod
     def validate_price(cls, v):
-        if v <= 0:
-            raise ValueError('Price must be positive')
-        return Decimal(str(v)).quantize(Decimal('0.01'))
+        # Положительность уже проверил Field(gt=0). v уже Decimal после
+        # разбора поля, повторный проход через str не нужен
+        return v.quantize(CENT)
     
     class Config:
         json_encoders = {
@@ -30,7 +40,8 @@ class OrderCreate(BaseModel):
     """Схема для создания заказа"""
     items: List[OrderItem] = Field(..., min_items=1, max_items=100)
     
-    @validator('items')
+    @field_validator('items')
+    @classmethod
     def validate_items(cls, v):
         if not v or len(v) == 0:
             raise ValueError('Order must contain at least one item')
@@ -40,44 +51,21 @@ class OrderCreate(BaseModel):
 
 class OrderUpdate(BaseModel):
     """Схема для обновления заказа"""
-    status: Optional[str] = Field(None, pattern='^(created|processing|completed|cancelled)$')
+    status: Optional[OrderStatus] = None
     items: Optional[List[OrderItem]] = Field(None, min_items=1, max_items=100)
-    
-    @validator('status')
-    def validate_status(cls, v):
-        if v is not None:
-            allowed_statuses = ['created', 'processing', 'completed', 'cancelled']
-            if v not in allowed_statuses:
-                raise ValueError(f'Invalid status. Allowed: {allowed_statuses}')
-        return v
 
 class OrderStatusUpdate(BaseModel):
     """Схема для обновления только статуса"""
-    status: str = Field(..., pattern='^(created|processing|completed|cancelled)$')
-    
-    @validator('status')
-    def validate_status(cls, v):
-        allowed_statuses = ['created', 'processing', 'completed', 'cancelled']
-        if v not in allowed_statuses:
-            raise ValueError(f'Invalid status. Allowed: {allowed_statuses}')
-        return v
+    status: OrderStatus
 
 class OrderSearch(BaseModel):
     """Схема для поиска заказов"""
     user_id: Optional[str] = None
-    status: Optional[str] = None
+    status: Optional[OrderStatus] = None
     min_amount: Optional[Decimal] = Field(None, ge=0)
     max_amount: Optional[Decimal] = Field(None, ge=0)
     page: int = Field(1, ge=1)
     per_page: int = Field(10, ge=1, le=100)
-    
-    @validator('status')
-    def validate_status(cls, v):
-        if v is not None:
-            allowed_statuses = ['created', 'processing', 'completed', 'cancelled']
-            if v not in allowed_statuses:
-                raise ValueError(f'Invalid status. Allowed: {allowed_statuses}')
-        return v
 
 class OrderResponse(BaseModel):
     """Схема ответа с данными заказа"""
@@ -1,27 +1,190 @@
 from flask import Flask, request, jsonify, g
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
 import os
 from datetime import datetime
 from sqlalchemy.orm import Session
-from database import SessionLocal, init_db
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
+from sqlalchemy import update, func, tuple_
+from database import db_session as db, init_db
 from models import User
-from auth import hash_password, verify_password, create_access_token, require_auth, require_role
+from auth import hash_password, verify_password, verify_and_update_password, create_access_token, require_auth, require_role, DUMMY_PASSWORD_HASH, UUIDConverter, parse_uuid
 from schemas import UserRegister, UserLogin, UserUpdate, PasswordChange, UserRoleUpdate, UserSearch
 from pydantic import ValidationError
-from logger import logger, log_request, log_response
+from logger import logger, log_request, log_response, new_request_id
+from user_cache import user_cache
 import uuid
 
+def json_default(value):
+    """
+    Типы, которых нет в orjson: строки with_entities и модель User
+
+    Словарь строится в момент сериализации и сразу освобождается, так что
+    списки передаются в jsonify как есть, без промежуточного списка словарей.
+    """
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, User):
+        return value.to_dict()
+    return str(value)
+
+class ORJSONProvider(JSONProvider):
+    """JSON провайдер Flask на orjson: jsonify и request.json без stdlib json"""
+    
+    # UUID и datetime сериализуются в orjson; datetime без tz считается UTC и пишется с Z
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=json_default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Байты orjson отдаются как есть, без промежуточной str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=json_default, option=self.option),
+            mimetype='application/json'
+        )
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+app.url_map.converters['uuid'] = UUIDConverter
 CORS(app)
 
 PORT = int(os.environ.get('PORT', 8001))
 
+# Списки пользователей читают только поля ответа: без password_hash
+# и без сборки ORM объектов
+USER_LIST_COLUMNS = (User.id, User.email, User.name, User.roles, User.created_at, User.updated_at)
+# Порядок совпадает с индексом ix_users_created
+USER_LIST_ORDER = (User.created_at.desc(), User.id.desc())
+
+def user_row(row):
+    """Словарь пользователя из строки with_entities (тот же, что to_dict)"""
+    return {
+        'id': row.id,
+        'email': row.email,
+        'name': row.name,
+        'roles': row.roles,
+        'created_at': row.created_at,
+        'updated_at': row.updated_at
+    }
+
+def encode_cursor(user):
+    """Курсор keyset пагинации: позиция пользователя в сортировке (created_at, id)"""
+    return f"{user['created_at'].isoformat()}_{user['id']}"
+
+def decode_cursor(cursor):
+    """Разбор курсора; ValueError при неверном формате"""
+    created_at, user_id = cursor.split('_', 1)
+    user_uuid = parse_uuid(user_id)
+    if user_uuid is None:
+        raise ValueError('Invalid user id in cursor')
+    return datetime.fromisoformat(created_at), user_uuid
+
+def paginate_users(query, page, per_page, cursor=None):
+    """
+    Страница списка и общее число одним запросом
+
+    count(*) OVER () считается в том же проходе, что и выборка строк,
+    отдельный SELECT count(*) нужен только для страницы за концом списка.
+    С курсором (позиция из decode_cursor) страница читается по индексу
+    ix_users_created без OFFSET, а общее число считается отдельно.
+    """
+    if cursor is not None:
+        rows = (
+            query.filter(tuple_(User.created_at, User.id) < tuple_(*cursor))
+            .order_by(*USER_LIST_ORDER)
+            .limit(per_page)
+            .all()
+        )
+        return [user_row(row) for row in rows], query.count()
+    
+    offset = (page - 1) * per_page
+    rows = (
+        query.add_columns(func.count().over().label('total'))
+        .order_by(*USER_LIST_ORDER)
+        .offset(offset)
+        .limit(per_page)
+        .all()
+    )
+    if rows:
+        total = rows[0].total
+    else:
+        total = query.count() if offset else 0
+    return [user_row(row) for row in rows], total
+
+def user_list_response(query, page, per_page):
+    """Ответ со страницей пользователей; cursor из запроса включает keyset пагинацию"""
+    cursor = request.args.get('cursor')
+    try:
+        cursor_position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'success': False, 'error': {'code': 'INVALID_CURSOR', 'message': 'Invalid pagination cursor'}}), 400
+    
+    users, total = paginate_users(query, page, per_page, cursor_position)
+    
+    return jsonify({
+        'success': True,
+        'data': users,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'next_cursor': encode_cursor(users[-1]) if len(users) == per_page else None
+        }
+    }), 200
+
+# Поля, которые admin может менять через PUT /v1/users/<id>
+USER_UPDATE_FIELDS = ('name', 'email')
+
+def get_user_dict(user_uuid):
+    """Словарь пользователя из кэша или из БД (с записью в кэш); None, если нет"""
+    user_dict = user_cache.get(user_uuid)
+    if user_dict is None:
+        user = db.query(User).filter(User.id == user_uuid).first()
+        if user is None:
+            return None
+        user_dict = user.to_dict()
+        user_cache.set(user_uuid, user_dict)
+    return user_dict
+
+def invalid_user_id():
+    return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid user ID format'}}), 400
+
+# Unique индекс на email (migration 001); postgres сообщает его имя в constraint_name
+EMAIL_UNIQUE_INDEX = 'ix_users_email'
+UNIQUE_VIOLATION = '23505'
+
+def is_email_conflict(error):
+    """IntegrityError вызван дублем email, а не другим ограничением"""
+    orig = error.orig
+    diag = getattr(orig, 'diag', None)
+    return (
+        getattr(orig, 'pgcode', None) == UNIQUE_VIOLATION
+        and getattr(diag, 'constraint_name', None) == EMAIL_UNIQUE_INDEX
+    )
+
+def email_exists_error(message):
+    """Ответ 400 EMAIL_EXISTS"""
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': 'EMAIL_EXISTS',
+            'message': message
+        }
+    }), 400
+
 @app.before_request
 def before_request():
     """Обработка запроса до маршрутизации"""
-    request_id = request.headers.get('X-Request-ID', str(uuid.uuid4()))
+    request_id = request.headers.get('X-Request-ID') or new_request_id()
     g.request_id = request_id
-    request.request_id = request_id
     log_request()
 
 @app.after_request
@@ -29,52 +192,42 @@ def after_request(response):
     """Обработка ответа"""
     return log_response(response)
 
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """Возврат соединения в пул после запроса"""
+    db.remove()
+
 @app.route('/v1/users/register', methods=['POST'])
 def register():
     """Регистрация нового пользователя"""
-    db = SessionLocal()
     try:
         data = request.json
         
-        if not data.get('email') or not data.get('password') or not data.get('name'):
-            return jsonify({
-                'success': False,
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Email, password and name are required'
-                }
-            }), 400
-        
-        if len(data['password']) < 6:
+        try:
+            user_data = UserRegister.model_validate(data)
+        except ValidationError as e:
             return jsonify({
                 'success': False,
                 'error': {
                     'code': 'VALIDATION_ERROR',
-                    'message': 'Password must be at least 6 characters'
-                }
-            }), 400
-        
-        existing_user = db.query(User).filter(User.email == data['email']).first()
-        if existing_user:
-            return jsonify({
-                'success': False,
-                'error': {
-                    'code': 'EMAIL_EXISTS',
-                    'message': 'User with this email already exists'
+                    'message': str(e.errors()[0]['msg'])
                 }
             }), 400
         
-        password_hash = hash_password(data['password'])
+        # Занятость email отдельным запросом не проверяется: дубль отсекает
+        # unique индекс на email, commit падает с IntegrityError
+        password_hash = hash_password(user_data.password)
         new_user = User(
+            # email сохраняется как передан: EmailStr приводит домен к нижнему
+            # регистру, а вход ищет email без нормализации
             email=data['email'],
-            name=data['name'],
+            name=user_data.name,
             password_hash=password_hash,
             roles=['user']
         )
         
         db.add(new_user)
         db.commit()
-        db.refresh(new_user)
         
         logger.info(
             'User registered successfully',
@@ -92,6 +245,8 @@ def register():
         }), 201
     except Exception as e:
         db.rollback()
+        if isinstance(e, IntegrityError) and is_email_conflict(e):
+            return email_exists_error('User with this email already exists')
         logger.error('User registration failed', exc_info=e, email=data.get('email'))
         return jsonify({
             'success': False,
@@ -100,14 +255,11 @@ def register():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 
 @app.route('/v1/users/login', methods=['POST'])
 def login():
     """Вход пользователя"""
-    db = SessionLocal()
     try:
         data = request.json
         
@@ -121,7 +273,9 @@ def login():
             }), 400
         
         user = db.query(User).filter(User.email == data['email']).first()
-        if not user or not verify_password(data['password'], user.password_hash):
+        # Хэш проверяется и для неизвестного email, время ответа одинаковое
+        password_ok, new_hash = verify_and_update_password(data['password'], user.password_hash if user else DUMMY_PASSWORD_HASH)
+        if not user or not password_ok:
             logger.warning('Failed login attempt', email=data.get('email'))
             return jsonify({
                 'success': False,
@@ -131,6 +285,11 @@ def login():
                 }
             }), 401
         
+        if new_hash:
+            # Пароль известен только сейчас: пересчитываем хэш старой схемы
+            user.password_hash = new_hash
+            db.commit()
+        
         token = create_access_token(str(user.id), user.email, user.roles)
         
         logger.info(
@@ -155,20 +314,17 @@ def login():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 
 @app.route('/v1/users/profile', methods=['GET'])
 @require_auth
 def get_profile():
     """Получение профиля текущего пользователя"""
-    db = SessionLocal()
     try:
         user_id = request.user.get('user_id')
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        user_dict = get_user_dict(uuid.UUID(user_id))
         
-        if not user:
+        if not user_dict:
             return jsonify({
                 'success': False,
                 'error': {
@@ -179,7 +335,7 @@ def get_profile():
         
         return jsonify({
             'success': True,
-            'data': user.to_dict()
+            'data': user_dict
         }), 200
     except Exception as e:
         return jsonify({
@@ -189,15 +345,12 @@ def get_profile():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 
 @app.route('/v1/users/profile', methods=['PUT'])
 @require_auth
 def update_profile():
     """Обновление профиля текущего пользователя"""
-    db = SessionLocal()
     try:
         user_id = request.user.get('user_id')
         user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
@@ -212,22 +365,26 @@ def update_profile():
             }), 404
         
         updates = request.json
-        if 'name' in updates:
-            user.name = updates['name']
-        if 'email' in updates:
-            existing = db.query(User).filter(User.email == updates['email'], User.id != user.id).first()
-            if existing:
-                return jsonify({
-                    'success': False,
-                    'error': {
-                        'code': 'EMAIL_EXISTS',
-                        'message': 'Email already in use'
-                    }
-                }), 400
+        try:
+            user_update = UserUpdate.model_validate(updates)
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': str(e.errors()[0]['msg'])
+                }
+            }), 400
+        
+        if user_update.name is not None:
+            user.name = user_update.name
+        if user_update.email is not None:
+            # Дубль email отсекает unique индекс (IntegrityError ниже);
+            # как в register, email сохраняется как передан
             user.email = updates['email']
         
         db.commit()
-        db.refresh(user)
+        user_cache.invalidate(user.id)
         
         return jsonify({
             'success': True,
@@ -235,6 +392,8 @@ def update_profile():
         }), 200
     except Exception as e:
         db.rollback()
+        if isinstance(e, IntegrityError) and is_email_conflict(e):
+            return email_exists_error('Email already in use')
         return jsonify({
             'success': False,
             'error': {
@@ -242,20 +401,17 @@ def update_profile():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 
 @app.route('/v1/users', methods=['GET'])
 @require_role('admin')
 def get_users():
     """Получение списка пользователей с пагинацией и поиском"""
-    db = SessionLocal()
     try:
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 10)), 100)
         
-        query = db.query(User)
+        query = db.query(User).with_entities(*USER_LIST_COLUMNS)
         search_query = request.args.get('query', '').strip()
         if search_query:
             search_pattern = f'%{search_query}%'
@@ -268,25 +424,9 @@ def get_users():
         if role:
             query = query.filter(User.roles.contains([role]))
         
-        total = query.count()
-        
-        offset = (page - 1) * per_page
-        users = query.offset(offset).limit(per_page).all()
-        
-        return jsonify({
-            'success': True,
-            'data': [user.to_dict() for user in users],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page
-            }
-        }), 200
+        return user_list_response(query, page, per_page)
     except Exception as e:
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
 
 @app.route('/users/health', methods=['GET'])
@@ -303,79 +443,81 @@ def status():
     """Status endpoint"""
     return jsonify({'status': 'Users service is running'}), 200
 
-@app.route('/v1/users/<user_id>', methods=['GET'])
+@app.route('/v1/users/<uuid:user_id>', methods=['GET'])
 @require_auth
 def get_user(user_id):
     """Получение пользователя по ID"""
-    db = SessionLocal()
+    if user_id is None:
+        return invalid_user_id()
     try:
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
-        if not user:
+        user_dict = get_user_dict(user_id)
+        if not user_dict:
             return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'User not found'}}), 404
-        return jsonify({'success': True, 'data': user.to_dict()}), 200
-    except ValueError:
-        return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid user ID format'}}), 400
+        return jsonify({'success': True, 'data': user_dict}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
-@app.route('/v1/users/<user_id>', methods=['PUT'])
+@app.route('/v1/users/<uuid:user_id>', methods=['PUT'])
 @require_role('admin')
 def update_user(user_id):
     """Обновление пользователя"""
-    db = SessionLocal()
+    if user_id is None:
+        return invalid_user_id()
     try:
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        updates = request.json
+        try:
+            user_update = UserUpdate.model_validate(updates)
+        except ValidationError as e:
+            return jsonify({'success': False, 'error': {'code': 'VALIDATION_ERROR', 'message': str(e.errors()[0]['msg'])}}), 400
+        changes = user_update.model_dump(include=set(USER_UPDATE_FIELDS), exclude_none=True)
+        if 'email' in changes:
+            # Как в register: email сохраняется как передан
+            changes['email'] = updates['email']
+        
+        if changes:
+            # Один UPDATE ... RETURNING вместо SELECT + UPDATE; updated_at ставит onupdate
+            stmt = update(User).where(User.id == user_id).values(**changes).returning(User)
+            user = db.execute(stmt).scalar_one_or_none()
+        else:
+            user = db.query(User).filter(User.id == user_id).first()
         if not user:
             return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'User not found'}}), 404
         
-        updates = request.json
-        if 'name' in updates:
-            user.name = updates['name']
-        if 'email' in updates:
-            user.email = updates['email']
-        
         db.commit()
-        db.refresh(user)
+        user_cache.invalidate(user_id)
         
         return jsonify({'success': True, 'data': user.to_dict()}), 200
-    except ValueError:
-        return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid user ID format'}}), 400
     except Exception as e:
         db.rollback()
+        if isinstance(e, IntegrityError) and is_email_conflict(e):
+            return email_exists_error('Email already in use')
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
-@app.route('/v1/users/<user_id>', methods=['DELETE'])
+@app.route('/v1/users/<uuid:user_id>', methods=['DELETE'])
 @require_role('admin')
 def delete_user(user_id):
     """Удаление пользователя"""
-    db = SessionLocal()
+    if user_id is None:
+        return invalid_user_id()
     try:
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        user = db.query(User).filter(User.id == user_id).first()
         if not user:
             return jsonify({'success': False, 'error': {'code': 'NOT_FOUND', 'message': 'User not found'}}), 404
         
         user_dict = user.to_dict()
         db.delete(user)
         db.commit()
+        user_cache.invalidate(user_id)
         
         return jsonify({'success': True, 'data': {'message': 'User deleted', 'deletedUser': user_dict}}), 200
-    except ValueError:
-        return jsonify({'success': False, 'error': {'code': 'INVALID_UUID', 'message': 'Invalid user ID format'}}), 400
     except Exception as e:
         db.rollback()
         return jsonify({'success': False, 'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}}), 500
-    finally:
-        db.close()
 
 @app.route('/v1/users/profile/password', methods=['PUT'])
 @require_auth
 def change_password():
     """Изменение пароля текущего пользователя"""
-    db = SessionLocal()
     try:
         data = request.json
         
@@ -390,10 +532,11 @@ def change_password():
                 }
             }), 400
         
-        user_id = request.user.get('user_id')
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        user_uuid = uuid.UUID(request.user.get('user_id'))
+        # Для проверки нужен только хэш: объект User не загружается
+        password_hash = db.query(User.password_hash).filter(User.id == user_uuid).scalar()
         
-        if not user:
+        if password_hash is None:
             return jsonify({
                 'success': False,
                 'error': {
@@ -402,7 +545,7 @@ def change_password():
                 }
             }), 404
         
-        if not verify_password(password_data.old_password, user.password_hash):
+        if not verify_password(password_data.old_password, password_hash):
             return jsonify({
                 'success': False,
                 'error': {
@@ -411,7 +554,9 @@ def change_password():
                 }
             }), 401
         
-        user.password_hash = hash_password(password_data.new_password)
+        db.execute(
+            update(User).where(User.id == user_uuid).values(password_hash=hash_password(password_data.new_password))
+        )
         db.commit()
         
         return jsonify({
@@ -429,14 +574,13 @@ def change_password():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
-@app.route('/v1/users/<user_id>/roles', methods=['PUT'])
+@app.route('/v1/users/<uuid:user_id>/roles', methods=['PUT'])
 @require_role('admin')
 def update_user_roles(user_id):
     """Обновление ролей пользователя (только admin)"""
-    db = SessionLocal()
+    if user_id is None:
+        return invalid_user_id()
     try:
         data = request.json
         
@@ -451,7 +595,9 @@ def update_user_roles(user_id):
                 }
             }), 400
         
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        # Один UPDATE ... RETURNING вместо SELECT + UPDATE
+        stmt = update(User).where(User.id == user_id).values(roles=role_data.roles).returning(User)
+        user = db.execute(stmt).scalar_one_or_none()
         if not user:
             return jsonify({
                 'success': False,
@@ -461,9 +607,8 @@ def update_user_roles(user_id):
                 }
             }), 404
         
-        user.roles = role_data.roles
         db.commit()
-        db.refresh(user)
+        user_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -472,14 +617,6 @@ def update_user_roles(user_id):
                 'message': 'User roles updated successfully'
             }
         }), 200
-    except ValueError:
-        return jsonify({
-            'success': False,
-            'error': {
-                'code': 'INVALID_UUID',
-                'message': 'Invalid user ID format'
-            }
-        }), 400
     except Exception as e:
         db.rollback()
         return jsonify({
@@ -489,14 +626,11 @@ def update_user_roles(user_id):
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 @app.route('/v1/users/search', methods=['GET'])
 @require_auth
 def search_users():
     """Поиск пользователей по имени или email"""
-    db = SessionLocal()
     try:
         search_query = request.args.get('q', '').strip()
         page = int(request.args.get('page', 1))
@@ -521,25 +655,12 @@ def search_users():
             }), 400
         
         search_pattern = f'%{search_query}%'
-        query = db.query(User).filter(
+        query = db.query(User).with_entities(*USER_LIST_COLUMNS).filter(
             (User.name.ilike(search_pattern)) | 
             (User.email.ilike(search_pattern))
         )
         
-        total = query.count()
-        offset = (page - 1) * per_page
-        users = query.offset(offset).limit(per_page).all()
-        
-        return jsonify({
-            'success': True,
-            'data': [user.to_dict() for user in users],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page
-            }
-        }), 200
+        return user_list_response(query, page, per_page)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -548,20 +669,20 @@ def search_users():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 @app.route('/v1/users/stats', methods=['GET'])
 @require_role('admin')
 def get_stats():
     """Получение статистики по пользователям (только admin)"""
-    db = SessionLocal()
     try:
-        total_users = db.query(User).count()
-        admin_users = db.query(User).filter(User.roles.contains(['admin'])).count()
+        # Оба счетчика одним проходом: count(*) и count(*) FILTER (WHERE roles @> ARRAY['admin'])
+        total_users, admin_users = db.query(
+            func.count(),
+            func.count().filter(User.roles.contains(['admin']))
+        ).select_from(User).one()
         regular_users = total_users - admin_users
         
-        recent_users = db.query(User).order_by(User.created_at.desc()).limit(5).all()
+        recent_users = db.query(User).with_entities(*USER_LIST_COLUMNS).order_by(*USER_LIST_ORDER).limit(5).all()
         
         return jsonify({
             'success': True,
@@ -569,7 +690,7 @@ def get_stats():
                 'total_users': total_users,
                 'admin_users': admin_users,
                 'regular_users': regular_users,
-                'recent_users': [user.to_dict() for user in recent_users]
+                'recent_users': recent_users
             }
         }), 200
     except Exception as e:
@@ -580,8 +701,6 @@ def get_stats():
                 'message': str(e)
             }
         }), 500
-    finally:
-        db.close()
 
 if __name__ == '__main__':
     print(f'Users service running on port {PORT}')
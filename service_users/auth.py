@@ -1,47 +1,139 @@
 """Утилиты для аутентификации и авторизации"""
 import os
+import re
+import time
+import uuid
+import hashlib
+import threading
 import jwt
+from cachetools import TTLCache
 from datetime import datetime, timedelta
-from passlib.hash import bcrypt
-from functools import wraps
+from passlib.context import CryptContext
+from functools import wraps, lru_cache
 from flask import request, jsonify
+from werkzeug.routing import BaseConverter
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
+JWT_EXPIRATION = timedelta(hours=JWT_EXPIRATION_HOURS)
+
+# Один экземпляр PyJWT и ключ в bytes на процесс, а не на каждый вызов
+_jwt = jwt.PyJWT()
+_jwt_key = JWT_SECRET.encode()
+
+# Стоимость bcrypt для новых хэшей; каждая единица удваивает время хэширования.
+# verify берет стоимость из самого хэша, поэтому старые пароли продолжают работать
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+# Схема для новых хэшей: bcrypt или argon2 (argon2id, быстрее bcrypt 12
+# при сопоставимой стойкости, но берет 64 МБ памяти на каждое хэширование)
+PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME', 'bcrypt')
+
+# Проверяются хэши обеих схем. Хэш не основной схемы или с другой стоимостью
+# bcrypt считается устаревшим и пересчитывается при успешном входе
+# (verify_and_update_password)
+pwd_context = CryptContext(
+    schemes=['bcrypt', 'argon2'],
+    default=PASSWORD_SCHEME,
+    deprecated='auto',
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    argon2__time_cost=2,
+    argon2__memory_cost=64 * 1024,
+    argon2__parallelism=1
+)
+
+# Кэш проверенных токенов: повторные запросы с тем же токеном не проверяют подпись заново
+_token_cache = TTLCache(maxsize=10000, ttl=60)
+_token_cache_lock = threading.Lock()
+
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+
+
+@lru_cache(maxsize=4096)
+def _cached_uuid(value):
+    return uuid.UUID(value)
+
+
+def parse_uuid(value):
+    """UUID из строки в каноническом формате или None, без исключений"""
+    if not isinstance(value, str) or not _UUID_RE.match(value):
+        return None
+    return _cached_uuid(value)
+
+
+class UUIDConverter(BaseConverter):
+    """
+    Конвертер URL: UUID разбирается один раз при маршрутизации
+
+    В отличие от встроенного uuid конвертера Werkzeug, неверный формат
+    не дает 404: в обработчик приходит None, и он отвечает 400 INVALID_UUID.
+    """
+
+    def to_python(self, value):
+        return parse_uuid(value)
+
+    def to_url(self, value):
+        return str(value)
 
 
 def hash_password(password: str) -> str:
-    """Хеширование пароля с использованием bcrypt"""
-    return bcrypt.hash(password)
+    """Хеширование пароля основной схемой (PASSWORD_SCHEME)"""
+    return pwd_context.hash(password)
 
 
 def verify_password(password: str, hashed: str) -> bool:
     """Проверка пароля"""
-    return bcrypt.verify(password, hashed)
+    return pwd_context.verify(password, hashed)
+
+
+def verify_and_update_password(password: str, hashed: str):
+    """
+    Проверка пароля с миграцией хэша
+
+    Возвращает (верен ли пароль, новый хэш или None). Новый хэш есть,
+    только если пароль верен, а хэш устарел (другая схема или стоимость).
+    """
+    return pwd_context.verify_and_update(password, hashed)
+
+
+# Хеш для входа с неизвестным email: проверка против него идет с той же
+# стоимостью bcrypt, что и для настоящего пользователя, поэтому по времени
+# ответа нельзя узнать, зарегистрирован ли email. Считается один раз при импорте
+DUMMY_PASSWORD_HASH = hash_password('dummy-password-for-timing')
 
 
 def create_access_token(user_id: str, email: str, roles: list) -> str:
     """Создание JWT токена"""
+    now = datetime.utcnow()
     payload = {
         'user_id': user_id,
         'email': email,
         'roles': roles,
-        'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
-        'iat': datetime.utcnow()
+        'exp': now + JWT_EXPIRATION,
+        'iat': now
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return _jwt.encode(payload, _jwt_key, algorithm=JWT_ALGORITHM)
 
 
 def decode_token(token: str) -> dict:
     """Декодирование JWT токена"""
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload.get('exp', 0) > time.time():
         return payload
+    
+    try:
+        payload = _jwt.decode(token, _jwt_key, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise Exception('Token expired')
     except jwt.InvalidTokenError:
         raise Exception('Invalid token')
+    
+    # Невалидные токены не кэшируются; запись живет не дольше 60 секунд и до exp
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
 
 
 def get_token_from_header() -> str:
@@ -50,7 +142,9 @@ def get_token_from_header() -> str:
     if not auth_header:
         raise Exception('Authorization header missing')
     
-    parts = auth_header.split()
+    # Разделители те же, что у split() (пробелы, табуляции, их повторы),
+    # но строка режется не больше двух раз: длинный хвост не дробится
+    parts = auth_header.split(None, 2)
     if len(parts) != 2 or parts[0].lower() != 'bearer':
         raise Exception('Invalid authorization header format')
     
@@ -0,0 +1,18 @@
+"""Конфигурация gunicorn для сервиса пользователей"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8001)}"
+
+# Потоки, а не gevent: ожидание PostgreSQL отпускает GIL, а bcrypt при
+# входе и регистрации занимает CPU и остановил бы event loop воркера
+worker_class = 'gthread'
+workers = int(os.environ.get('USERS_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('USERS_THREADS', 4))
+
+# Пул соединений SQLAlchemy свой в каждом воркере: не меньше числа потоков
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
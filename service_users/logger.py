@@ -2,7 +2,8 @@
 Модуль для структурированного логирования в Service Users
 """
 import logging
-import json
+import os
+import orjson
 import sys
 from datetime import datetime
 from flask import request, g
@@ -83,12 +84,16 @@ class StructuredLogger:
         extra.update(kwargs)
         self.logger.debug(message, extra={'structured': extra})
 
+# datetime без tz считается UTC и пишется с суффиксом Z
+LOG_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
 class JsonFormatter(logging.Formatter):
     """Formatter для вывода логов в JSON формате"""
     
     def format(self, record):
         log_data = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            # Время создания записи; в ISO с Z его переводит orjson
+            'timestamp': datetime.utcfromtimestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -107,18 +112,20 @@ class JsonFormatter(logging.Formatter):
                 'traceback': self.formatException(record.exc_info)
             }
         
-        return json.dumps(log_data, ensure_ascii=False)
+        return orjson.dumps(log_data, default=str, option=LOG_JSON_OPTIONS).decode()
 
 # Создаем глобальный экземпляр логгера
 logger = StructuredLogger('service_users')
 
+def new_request_id():
+    """X-Request-ID для запроса без заголовка: UUID v4 строкой из os.urandom"""
+    h = os.urandom(16).hex()
+    return f'{h[:8]}-{h[8:12]}-4{h[13:16]}-{"89ab"[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}'
+
 def log_request():
     """Middleware для логирования входящих запросов"""
-    from flask import g
-    
-    # Получаем request_id из заголовков
-    request_id = request.headers.get('X-Request-ID', 'unknown')
-    g.request_id = request_id
+    # request_id уже выставлен в before_request
+    request_id = g.request_id
     
     # Логируем входящий запрос
     logger.info(
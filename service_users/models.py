@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ARRAY
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Index, DDL, event
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from database import Base
 
 class User(Base):
@@ -15,13 +15,37 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Список пользователей по дате регистрации: LIMIT/OFFSET идет
+        # по индексу вместо сортировки всей таблицы
+        Index('ix_users_created', created_at.desc(), id.desc()),
+        # Фильтр по роли (roles @> ARRAY[...])
+        Index('ix_users_roles_gin', 'roles', postgresql_using='gin'),
+        # Поиск ilike '%q%' по имени и email через триграммы
+        Index('ix_users_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_users_email_trgm', 'email', postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}),
+    )
+
     def to_dict(self):
-        """Преобразование модели в словарь"""
+        """
+        Преобразование модели в словарь
+
+        UUID и datetime остаются объектами: их сериализует orjson
+        провайдер приложения (datetime в ISO формате с суффиксом Z).
+        """
         return {
-            'id': str(self.id),
+            'id': self.id,
             'email': self.email,
             'name': self.name,
             'roles': self.roles,
-            'created_at': self.created_at.isoformat() + 'Z',
-            'updated_at': self.updated_at.isoformat() + 'Z'
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
+
+
+# Триграммные индексы требуют расширения pg_trgm: create_all ставит его до таблиц
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
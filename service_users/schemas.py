@@ -1,29 +1,21 @@
-from pydantic import BaseModel, EmailStr, Field, validator, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field, StringConstraints, ValidationInfo, field_validator
+from typing import Annotated, List, Literal, Optional
 from datetime import datetime
-import re
+
+# Допустимые роли: Literal проверяется в pydantic-core без Python валидатора
+UserRole = Literal['user', 'admin']
+
+# Имя без пробелов по краям: strip и проверка длины после него выполняются
+# в pydantic-core, Python валидатор не нужен
+UserName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=2, max_length=100)]
+# Новый пароль при регистрации и смене
+UserPassword = Annotated[str, StringConstraints(min_length=6, max_length=100)]
 
 class UserRegister(BaseModel):
     """Схема для регистрации пользователя"""
     email: EmailStr
-    password: str = Field(..., min_length=6, max_length=100)
-    name: str = Field(..., min_length=2, max_length=100)
-    
-    @validator('password')
-    def validate_password(cls, v):
-        if len(v) < 6:
-            raise ValueError('Password must be at least 6 characters')
-        if len(v) > 100:
-            raise ValueError('Password is too long')
-        return v
-    
-    @validator('name')
-    def validate_name(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Name cannot be empty')
-        if len(v.strip()) < 2:
-            raise ValueError('Name must be at least 2 characters')
-        return v.strip()
+    password: UserPassword
+    name: UserName
 
 class UserLogin(BaseModel):
     """Схема для входа пользователя"""
@@ -32,55 +24,31 @@ class UserLogin(BaseModel):
 
 class UserUpdate(BaseModel):
     """Схема для обновления профиля пользователя"""
-    name: Optional[str] = Field(None, min_length=2, max_length=100)
+    name: Optional[UserName] = None
     email: Optional[EmailStr] = None
-    
-    @validator('name')
-    def validate_name(cls, v):
-        if v is not None:
-            if not v.strip():
-                raise ValueError('Name cannot be empty')
-            if len(v.strip()) < 2:
-                raise ValueError('Name must be at least 2 characters')
-        return v.strip() if v else v
 
 class PasswordChange(BaseModel):
     """Схема для изменения пароля"""
     old_password: str = Field(..., min_length=6)
-    new_password: str = Field(..., min_length=6, max_length=100)
+    new_password: UserPassword
     
-    @validator('new_password')
-    def validate_new_password(cls, v, values):
-        if 'old_password' in values and v == values['old_password']:
+    @field_validator('new_password')
+    @classmethod
+    def validate_new_password(cls, v, info: ValidationInfo):
+        if v == info.data.get('old_password'):
             raise ValueError('New password must be different from old password')
-        if len(v) < 6:
-            raise ValueError('New password must be at least 6 characters')
         return v
 
 class UserRoleUpdate(BaseModel):
     """Схема для обновления ролей пользователя (только admin)"""
-    roles: List[str] = Field(..., min_items=1)
-    
-    @validator('roles')
-    def validate_roles(cls, v):
-        allowed_roles = ['user', 'admin']
-        for role in v:
-            if role not in allowed_roles:
-                raise ValueError(f'Invalid role: {role}. Allowed roles: {allowed_roles}')
-        return v
+    roles: List[UserRole] = Field(..., min_length=1)
 
 class UserSearch(BaseModel):
     """Схема для поиска пользователей"""
     query: Optional[str] = Field(None, max_length=100)
-    role: Optional[str] = None
+    role: Optional[UserRole] = None
     page: int = Field(1, ge=1)
     per_page: int = Field(10, ge=1, le=100)
-    
-    @validator('role')
-    def validate_role(cls, v):
-        if v is not None and v not in ['user', 'admin']:
-            raise ValueError('Invalid role')
-        return v
 
 class UserResponse(BaseModel):
     """Схема ответа с данными пользователя"""
@@ -91,21 +59,19 @@ class UserResponse(BaseModel):
     created_at: str
     updated_at: str
 
-class TokenResponse(BaseModel):
-    """Схема ответа с токеном"""
+class SuccessResponse(BaseModel):
+    """Базовая схема успешного ответа"""
     success: bool = True
     data: dict
 
+# Ответ с токеном устроен так же, как успешный: отдельная схема не строится
+TokenResponse = SuccessResponse
+
 class ErrorResponse(BaseModel):
     """Схема ответа с ошибкой"""
     success: bool = False
     error: dict
 
-class SuccessResponse(BaseModel):
-    """Базовая схема успешного ответа"""
-    success: bool = True
-    data: dict
-
 class PaginatedResponse(BaseModel):
     """Схема для пагинированных ответов"""
     success: bool = True
@@ -0,0 +1,85 @@
+"""
+Кэш профилей пользователей в Redis для сервиса пользователей
+"""
+import os
+import time
+import orjson
+import redis
+from logger import logger
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+
+# datetime без tz считается UTC и пишется с суффиксом Z, как в ответах API
+CACHE_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+class UserCache:
+    """
+    Cache-aside кэш словарей User.to_dict() по id пользователя
+
+    Изменяющие эндпоинты удаляют запись после commit. Чтение, начатое до
+    commit, может положить старую копию обратно, поэтому TTL ограничивает
+    время, в течение которого она видна.
+    """
+
+    def __init__(self, url=REDIS_URL, prefix='users', ttl=USER_CACHE_TTL, retry_interval=5):
+        """
+        :param url: Адрес Redis (пустая строка отключает кэш)
+        :param prefix: Префикс ключей
+        :param ttl: Время жизни записи (секунды)
+        :param retry_interval: Пауза перед повторным обращением к Redis после ошибки (секунды)
+        """
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=0.2, socket_connect_timeout=0.2
+        ) if url else None
+        self.prefix = prefix
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._disabled_until = 0.0
+
+    @property
+    def available(self):
+        return self.client is not None and time.monotonic() >= self._disabled_until
+
+    def _fail(self, operation, exc):
+        # Кэш не должен ломать запросы: временно работаем напрямую с БД
+        self._disabled_until = time.monotonic() + self.retry_interval
+        logger.warning('User cache unavailable', operation=operation, error=str(exc))
+
+    def _key(self, user_id):
+        return f'{self.prefix}:user:{user_id}'
+
+    def get(self, user_id):
+        """Словарь пользователя или None при промахе"""
+        if not self.available:
+            return None
+        try:
+            raw = self.client.get(self._key(user_id))
+        except redis.RedisError as e:
+            self._fail('get', e)
+            return None
+        return orjson.loads(raw) if raw is not None else None
+
+    def set(self, user_id, user_dict):
+        if not self.available:
+            return
+        try:
+            self.client.set(
+                self._key(user_id),
+                orjson.dumps(user_dict, default=str, option=CACHE_JSON_OPTIONS),
+                ex=self.ttl
+            )
+        except redis.RedisError as e:
+            self._fail('set', e)
+
+    def invalidate(self, user_id):
+        if not self.available:
+            return
+        try:
+            self.client.delete(self._key(user_id))
+        except redis.RedisError as e:
+            self._fail('invalidate', e)
+
+
+user_cache = UserCache()
@@ -2,263 +2,241 @@
 Интеграционные тесты для API
 """
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import sys
 import uuid
 
 BASE_URL = "http://localhost:8080"
 
+# URL эндпоинтов собираются один раз при импорте
+HEALTH_URL = f"{BASE_URL}/health"
+REGISTER_URL = f"{BASE_URL}/v1/users/register"
+LOGIN_URL = f"{BASE_URL}/v1/users/login"
+PROFILE_URL = f"{BASE_URL}/v1/users/profile"
+ORDERS_URL = f"{BASE_URL}/v1/orders"
+ORDERS_LIST_URL = f"{ORDERS_URL}?page=1&per_page=10"
+MY_STATS_URL = f"{ORDERS_URL}/my-stats"
+
+# Одна сессия на все тесты: keep-alive соединения вместо нового TCP на каждый запрос
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
 # Цвета для вывода
 GREEN = "\033[92m"
 RED = "\033[91m"
 RESET = "\033[0m"
 YELLOW = "\033[93m"
 
-def print_test(name, passed, message=""):
-    """Красивый вывод результата теста"""
+def auth_headers(token):
+    """Заголовок Authorization для запросов с токеном"""
+    return {"Authorization": f"Bearer {token}"}
+
+def format_result(name, passed, message=""):
+    """Строки результата теста: статус и, при провале, сообщение"""
     status = f"{GREEN}✓ PASS{RESET}" if passed else f"{RED}✗ FAIL{RESET}"
-    print(f"{status} {name}")
+    lines = [f"{status} {name}"]
     if message and not passed:
-        print(f"     {message}")
+        lines.append(f"     {message}")
+    return lines
 
-def test_health_check():
-    """Тест проверки здоровья системы"""
-    try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
-        passed = response.status_code == 200 and response.json().get('status') == 'OK'
-        print_test("Health Check", passed)
-        return passed
-    except Exception as e:
-        print_test("Health Check", False, str(e))
-        return False
+def run_check(check, ctx):
+    """
+    Один тест: исключение считается провалом
 
-def test_user_registration():
-    """Тест регистрации пользователя"""
+    Тест возвращает passed или (passed, message).
+    """
     try:
-        email = f"test_{uuid.uuid4()}@example.com"
-        data = {
-            "email": email,
-            "password": "password123",
-            "name": "Test User"
-        }
-        response = requests.post(f"{BASE_URL}/v1/users/register", json=data, timeout=5)
-        passed = response.status_code == 201
-        print_test("User Registration", passed)
-        return passed, email if passed else None
+        result = check(ctx)
     except Exception as e:
-        print_test("User Registration", False, str(e))
-        return False, None
+        return False, str(e)
+    return result if isinstance(result, tuple) else (result, "")
+
+def run_batch(title, checks, ctx, parallel=False):
+    """
+    Группа тестов (название, функция от ctx) с выводом одной записью в stdout
+
+    Состояние между тестами (email, token, order_id) передается через ctx.
+    parallel=True для независимых тестов; порядок вывода совпадает с таблицей.
+    """
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            outcomes = list(executor.map(lambda item: run_check(item[1], ctx), checks))
+    else:
+        outcomes = [run_check(check, ctx) for _, check in checks]
+    
+    lines = [f"\n{YELLOW}{title}:{RESET}"] if title else []
+    for (name, _), (passed, message) in zip(checks, outcomes):
+        lines.extend(format_result(name, passed, message))
+    sys.stdout.write("\n".join(lines) + "\n")
+    return [passed for passed, _ in outcomes]
 
-def test_user_login(email):
-    """Тест входа пользователя"""
-    try:
-        data = {
-            "email": email,
-            "password": "password123"
-        }
-        response = requests.post(f"{BASE_URL}/v1/users/login", json=data, timeout=5)
-        passed = response.status_code == 200 and 'token' in response.json().get('data', {})
-        token = response.json()['data']['token'] if passed else None
-        print_test("User Login", passed)
-        return passed, token
-    except Exception as e:
-        print_test("User Login", False, str(e))
-        return False, None
+def check_health(ctx):
+    """Тест проверки здоровья системы"""
+    response = SESSION.get(HEALTH_URL, timeout=5)
+    return response.status_code == 200 and response.json().get('status') == 'OK'
 
-def test_get_profile(token):
+def check_unauthorized_access(ctx):
+    """Тест доступа без токена"""
+    return SESSION.get(PROFILE_URL, timeout=5).status_code == 401
+
+def check_invalid_credentials(ctx):
+    """Тест входа с неверными данными"""
+    data = {
+        "email": "nonexistent@example.com",
+        "password": "wrongpassword"
+    }
+    return SESSION.post(LOGIN_URL, json=data, timeout=5).status_code == 401
+
+def check_validation(ctx):
+    """Тест валидации данных"""
+    # Пароль слишком короткий
+    data = {
+        "email": "test@example.com",
+        "password": "123",  # Меньше 6 символов
+        "name": "Test"
+    }
+    return SESSION.post(REGISTER_URL, json=data, timeout=5).status_code == 400
+
+def check_user_registration(ctx):
+    """Тест регистрации пользователя"""
+    email = f"test_{uuid.uuid4()}@example.com"
+    data = {
+        "email": email,
+        "password": "password123",
+        "name": "Test User"
+    }
+    response = SESSION.post(REGISTER_URL, json=data, timeout=5)
+    passed = response.status_code == 201
+    if passed:
+        ctx['email'] = email
+    return passed
+
+def check_user_login(ctx):
+    """Тест входа пользователя"""
+    data = {
+        "email": ctx['email'],
+        "password": "password123"
+    }
+    response = SESSION.post(LOGIN_URL, json=data, timeout=5)
+    passed = response.status_code == 200 and 'token' in response.json().get('data', {})
+    if passed:
+        ctx['token'] = response.json()['data']['token']
+    return passed
+
+def check_get_profile(ctx):
     """Тест получения профиля"""
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{BASE_URL}/v1/users/profile", headers=headers, timeout=5)
-        passed = response.status_code == 200
-        print_test("Get Profile", passed)
-        return passed
-    except Exception as e:
-        print_test("Get Profile", False, str(e))
-        return False
+    return SESSION.get(PROFILE_URL, headers=auth_headers(ctx['token']), timeout=5).status_code == 200
 
-def test_create_order(token):
+def check_create_order(ctx):
     """Тест создания заказа"""
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        data = {
-            "items": [
-                {"product": "Test Product 1", "quantity": 2, "price": 99.99},
-                {"product": "Test Product 2", "quantity": 1, "price": 49.99}
-            ]
-        }
-        response = requests.post(f"{BASE_URL}/v1/orders", json=data, headers=headers, timeout=5)
-        passed = response.status_code == 201
-        order_id = response.json().get('data', {}).get('id') if passed else None
-        print_test("Create Order", passed)
-        return passed, order_id
-    except Exception as e:
-        print_test("Create Order", False, str(e))
-        return False, None
-
-def test_get_order(token, order_id):
+    data = {
+        "items": [
+            {"product": "Test Product 1", "quantity": 2, "price": 99.99},
+            {"product": "Test Product 2", "quantity": 1, "price": 49.99}
+        ]
+    }
+    response = SESSION.post(ORDERS_URL, json=data, headers=auth_headers(ctx['token']), timeout=5)
+    passed = response.status_code == 201
+    if passed:
+        ctx['order_id'] = response.json().get('data', {}).get('id')
+    return passed
+
+def check_get_order(ctx):
     """Тест получения заказа"""
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{BASE_URL}/v1/orders/{order_id}", headers=headers, timeout=5)
-        passed = response.status_code == 200
-        print_test("Get Order", passed)
-        return passed
-    except Exception as e:
-        print_test("Get Order", False, str(e))
-        return False
+    response = SESSION.get(f"{ORDERS_URL}/{ctx['order_id']}", headers=auth_headers(ctx['token']), timeout=5)
+    return response.status_code == 200
 
-def test_get_orders(token):
+def check_get_orders(ctx):
     """Тест получения списка заказов"""
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{BASE_URL}/v1/orders?page=1&per_page=10", headers=headers, timeout=5)
-        passed = response.status_code == 200
-        print_test("Get Orders List", passed)
-        return passed
-    except Exception as e:
-        print_test("Get Orders List", False, str(e))
-        return False
+    return SESSION.get(ORDERS_LIST_URL, headers=auth_headers(ctx['token']), timeout=5).status_code == 200
 
-def test_update_order_status(token, order_id):
-    """Тест обновления статуса заказа"""
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        data = {"status": "cancelled"}
-        response = requests.put(f"{BASE_URL}/v1/orders/{order_id}/status", json=data, headers=headers, timeout=5)
-        passed = response.status_code == 200
-        print_test("Update Order Status", passed)
-        return passed
-    except Exception as e:
-        print_test("Update Order Status", False, str(e))
-        return False
-
-def test_my_stats(token):
+def check_my_stats(ctx):
     """Тест получения своей статистики"""
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{BASE_URL}/v1/orders/my-stats", headers=headers, timeout=5)
-        passed = response.status_code == 200
-        print_test("Get My Stats", passed)
-        return passed
-    except Exception as e:
-        print_test("Get My Stats", False, str(e))
-        return False
+    return SESSION.get(MY_STATS_URL, headers=auth_headers(ctx['token']), timeout=5).status_code == 200
+
+def check_update_order_status(ctx):
+    """Тест обновления статуса заказа"""
+    data = {"status": "cancelled"}
+    response = SESSION.put(
+        f"{ORDERS_URL}/{ctx['order_id']}/status", json=data, headers=auth_headers(ctx['token']), timeout=5
+    )
+    return response.status_code == 200
 
-def test_rate_limiting():
+def check_rate_limiting(ctx):
     """Тест rate limiting"""
-    try:
-        # Делаем много запросов подряд
-        email = f"ratelimit_{uuid.uuid4()}@example.com"
-        success_count = 0
-        rate_limited = False
-        
-        for i in range(15):  # Auth limiter: 10 запросов в минуту
-            data = {
-                "email": email,
-                "password": "password123",
-                "name": "Rate Test"
-            }
-            response = requests.post(f"{BASE_URL}/v1/users/register", json=data, timeout=5)
+    # Запросы уходят одновременно; при первом 429 оставшиеся отменяются
+    email = f"ratelimit_{uuid.uuid4()}@example.com"
+    # Тело одинаковое для всех запросов: сериализуется один раз
+    body = json.dumps({
+        "email": email,
+        "password": "password123",
+        "name": "Rate Test"
+    }).encode()
+    headers = {"Content-Type": "application/json"}
+    success_count = 0
+    rate_limited = False
+    
+    with ThreadPoolExecutor(max_workers=12) as executor:  # Auth limiter: 10 запросов в минуту
+        futures = [
+            executor.submit(SESSION.post, REGISTER_URL, data=body, headers=headers, timeout=5)
+            for _ in range(12)
+        ]
+        for future in as_completed(futures):
+            response = future.result()
             if response.status_code == 429:
                 rate_limited = True
+                for pending in futures:
+                    pending.cancel()
                 break
             elif response.status_code < 500:
                 success_count += 1
-            time.sleep(0.1)
-        
-        passed = rate_limited  # Должны получить 429 после лимита
-        print_test("Rate Limiting", passed, f"Successful: {success_count}, Limited: {rate_limited}")
-        return passed
-    except Exception as e:
-        print_test("Rate Limiting", False, str(e))
-        return False
-
-def test_unauthorized_access():
-    """Тест доступа без токена"""
-    try:
-        response = requests.get(f"{BASE_URL}/v1/users/profile", timeout=5)
-        passed = response.status_code == 401
-        print_test("Unauthorized Access Protection", passed)
-        return passed
-    except Exception as e:
-        print_test("Unauthorized Access Protection", False, str(e))
-        return False
-
-def test_invalid_credentials():
-    """Тест входа с неверными данными"""
-    try:
-        data = {
-            "email": "nonexistent@example.com",
-            "password": "wrongpassword"
-        }
-        response = requests.post(f"{BASE_URL}/v1/users/login", json=data, timeout=5)
-        passed = response.status_code == 401
-        print_test("Invalid Credentials Handling", passed)
-        return passed
-    except Exception as e:
-        print_test("Invalid Credentials Handling", False, str(e))
-        return False
-
-def test_validation():
-    """Тест валидации данных"""
-    try:
-        # Пароль слишком короткий
-        data = {
-            "email": "test@example.com",
-            "password": "123",  # Меньше 6 символов
-            "name": "Test"
-        }
-        response = requests.post(f"{BASE_URL}/v1/users/register", json=data, timeout=5)
-        passed = response.status_code == 400
-        print_test("Validation (Short Password)", passed)
-        return passed
-    except Exception as e:
-        print_test("Validation (Short Password)", False, str(e))
-        return False
+    
+    passed = rate_limited  # Должны получить 429 после лимита
+    return passed, f"Successful: {success_count}, Limited: {rate_limited}"
+
+# Независимые проверки без состояния
+BASIC_CHECKS = [
+    ("Health Check", check_health),
+    ("Unauthorized Access Protection", check_unauthorized_access),
+    ("Invalid Credentials Handling", check_invalid_credentials),
+    ("Validation (Short Password)", check_validation),
+]
+
+# Чтения созданного заказа; отмена меняет заказ, поэтому идет после них
+ORDER_READ_CHECKS = [
+    ("Get Order", check_get_order),
+    ("Get Orders List", check_get_orders),
+    ("Get My Stats", check_my_stats),
+]
 
 def run_all_tests():
     """Запуск всех тестов"""
     print(f"\n{YELLOW}{'='*60}{RESET}")
     print(f"{YELLOW}Запуск интеграционных тестов API{RESET}")
-    print(f"{YELLOW}{'='*60}{RESET}\n")
+    print(f"{YELLOW}{'='*60}{RESET}")
     
+    ctx = {}
     results = []
     
     # Базовые тесты
-    print(f"{YELLOW}Базовые проверки:{RESET}")
-    results.append(test_health_check())
-    results.append(test_unauthorized_access())
-    results.append(test_invalid_credentials())
-    results.append(test_validation())
+    results.extend(run_batch("Базовые проверки", BASIC_CHECKS, ctx, parallel=True))
     
-    # Тесты с аутентификацией
-    print(f"\n{YELLOW}Аутентификация:{RESET}")
-    passed, email = test_user_registration()
-    results.append(passed)
+    # Тесты с аутентификацией: каждый следующий шаг только после успеха предыдущего
+    results.extend(run_batch("Аутентификация", [("User Registration", check_user_registration)], ctx))
+    if 'email' in ctx:
+        results.extend(run_batch(None, [("User Login", check_user_login)], ctx))
     
-    if passed and email:
-        passed, token = test_user_login(email)
-        results.append(passed)
-        
-        if passed and token:
-            # Тесты пользователей
-            print(f"\n{YELLOW}Операции с пользователями:{RESET}")
-            results.append(test_get_profile(token))
-            
-            # Тесты заказов
-            print(f"\n{YELLOW}Операции с заказами:{RESET}")
-            passed, order_id = test_create_order(token)
-            results.append(passed)
-            
-            if passed and order_id:
-                results.append(test_get_order(token, order_id))
-                results.append(test_get_orders(token))
-                results.append(test_update_order_status(token, order_id))
-                results.append(test_my_stats(token))
+    if 'token' in ctx:
+        results.extend(run_batch("Операции с пользователями", [("Get Profile", check_get_profile)], ctx))
+        results.extend(run_batch("Операции с заказами", [("Create Order", check_create_order)], ctx))
+        if ctx.get('order_id'):
+            results.extend(run_batch(None, ORDER_READ_CHECKS, ctx, parallel=True))
+            results.extend(run_batch(None, [("Update Order Status", check_update_order_status)], ctx))
     
     # Rate Limiting
-    print(f"\n{YELLOW}Rate Limiting:{RESET}")
-    results.append(test_rate_limiting())
+    results.extend(run_batch("Rate Limiting", [("Rate Limiting", check_rate_limiting)], ctx))
     
     # Итоги
     passed_count = sum(results)
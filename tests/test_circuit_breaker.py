@@ -0,0 +1,77 @@
+"""
+Модульные тесты счетчиков Circuit Breaker (без запущенных сервисов)
+
+Запуск: pytest test_circuit_breaker.py
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api_gateway'))
+
+from circuit_breaker import AtomicCounter, CircuitBreaker  # noqa: E402
+
+THREADS = 8
+INCREMENTS = 20000
+
+
+def run_threads(target, count=THREADS):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_value_does_not_advance_counter():
+    counter = AtomicCounter()
+    assert counter.value == 0
+    assert counter.value == 0
+    counter.increment()
+    counter.increment()
+    assert counter.value == 2
+    assert counter.value == 2
+
+
+def test_concurrent_increments_and_reads_are_exact():
+    counter = AtomicCounter()
+    done = threading.Event()
+    errors = []
+
+    def reader():
+        last = 0
+        while not done.is_set():
+            value = counter.value
+            # Значение не убывает и не превышает число инкрементов
+            if not last <= value <= THREADS * INCREMENTS:
+                errors.append((last, value))
+            last = value
+
+    def writer():
+        for _ in range(INCREMENTS):
+            counter.increment()
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    run_threads(writer)
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert counter.value == THREADS * INCREMENTS
+
+
+def test_breaker_counts_every_request():
+    breaker = CircuitBreaker('test_service', min_requests=10 ** 9)
+
+    def worker():
+        for _ in range(1000):
+            breaker.call(lambda: None)
+
+    run_threads(worker)
+    stats = breaker.get_stats()
+    assert stats['total_requests'] == THREADS * 1000
+    assert stats['window_successes'] == THREADS * 1000
+    assert stats['total_failures'] == 0